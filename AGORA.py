@@ -4,10 +4,11 @@ import pandas as pd
 import praw
 import gspread
 from google.oauth2.service_account import Credentials
-from textblob import TextBlob
+from agora_sentiment import get_backend
 from collections import defaultdict
 from datetime import datetime, timedelta
 from openai import OpenAI
+from agora_reddit import get_reddit_pool, search_subreddits
 import uuid
 from PIL import Image
 import plotly.express as px
@@ -355,6 +356,12 @@ reddit = praw.Reddit(
     user_agent=st.secrets["reddit"]["user_agent"]
 )
 
+SEARCH_TIMEOUT = 10  # seconds per subreddit search request
+SEARCH_WORKERS = dict(st.secrets.get("topic_search", {})).get("workers", 8)  # concurrent searches per process
+
+# Topic searches check out their own PRAW instance; PRAW isn't thread-safe
+reddit_pool = get_reddit_pool(st.secrets["reddit"], lambda: {"requestor_kwargs": {"timeout": SEARCH_TIMEOUT}}, max_size=SEARCH_WORKERS)
+
 curated_subreddits = [
     "news", "worldnews", "politics", "uspolitics",
     "ukpolitics", "geopolitics", "europe", "MiddleEastNews",
@@ -478,14 +485,13 @@ just human voices and emotional clarity.
     manual_subreddit = st.selectbox("Or pick a subreddit:", curated_subreddits, key="manual_subreddit_select")
 
     if topic:
-        for sub in curated_subreddits:
-            try:
-                for post in reddit.subreddit(sub).search(topic, sort="relevance", time_filter="week", limit=3):
-                    if not post.stickied and post.title not in post_dict:
-                        headline_options.append(post.title)
-                        post_dict[post.title] = post
-            except:
-                continue
+        search_posts, search_failures = search_subreddits(reddit_pool, curated_subreddits, topic, limit=3, timeout=SEARCH_TIMEOUT, max_workers=SEARCH_WORKERS)
+        for post in search_posts:
+            if post.title not in post_dict:
+                headline_options.append(post.title)
+                post_dict[post.title] = post
+        if search_failures:
+            st.caption("Couldn't reach: " + ", ".join(f"r/{sub}" for sub in search_failures))
     elif manual_subreddit:
         try:
             for post in reddit.subreddit(manual_subreddit).hot(limit=15):
@@ -528,12 +534,11 @@ just human voices and emotional clarity.
         emotion_counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
         emotion_groups = defaultdict(list)
 
-        for comment in comments:
-            text = comment.body.strip()
+        texts = [comment.body.strip() for comment in comments]
+        polarities, labels = get_backend(st.secrets.get("sentiment", {})).score(texts)
+        for comment, text, polarity, label in zip(comments, texts, polarities.tolist(), labels):
             if not text or len(text) < 10:
                 continue
-            polarity = TextBlob(text).sentiment.polarity
-            label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
             emotion_counts[label] += 1
             emotion_groups[label].append({
                 "text": text,
@@ -748,10 +753,8 @@ elif view_mode == "Ask Agora":
             top_comments = [c for c in top_comments if len(c.body.strip()) > 10][:10]
 
             grouped = {"Positive": [], "Neutral": [], "Negative": []}
-            for comment in top_comments:
-                text = comment.body.strip()[:200]
-                polarity = TextBlob(text).sentiment.polarity
-                label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
+            texts = [comment.body.strip()[:200] for comment in top_comments]
+            for text, label in zip(texts, get_backend(st.secrets.get("sentiment", {})).score(texts)[1]):
                 grouped[label].append(f'"{text}"')
 
             grouped_summary = ""
@@ -850,9 +853,8 @@ elif view_mode == "Ask Agora":
             top_comments = [c for c in top_comments if len(c.body.strip()) > 10][:10]
 
             comment_summary = ""
-            for i, comment in enumerate(top_comments, 1):
-                polarity = TextBlob(comment.body).sentiment.polarity
-                label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
+            labels = get_backend(st.secrets.get("sentiment", {})).score([comment.body for comment in top_comments])[1]
+            for i, (comment, label) in enumerate(zip(top_comments, labels), 1):
                 comment_summary += f"{i}. \"{comment.body.strip()[:200]}\" ({label})\n"
 
             try:
@@ -5,11 +5,29 @@ import pandas as pd
 import praw
 import gspread
 from google.oauth2.service_account import Credentials
-from textblob import TextBlob
+from agora_sentiment import SentimentCache, get_backend
 from collections import defaultdict
 from datetime import datetime, timedelta
 from openai import OpenAI
+from agora_reddit import ListingCache, fetch_comment_tree, fetch_listing, get_reddit_pool, search_subreddits, top_level_comments
+from agora_storage import AGORA_TABS, open_storage
+from agora_write_queue import WriteBehindQueue
+from agora_retention import RetentionManager
+from agora_cache import FrameCache
+from agora_sync import DeltaSync
+from agora_comments import comment_key, SNIPPET_LENGTH
+from agora_counters import ReactionCounters
+from agora_ingest import IngestStore
+from agora_search import SearchIndex
+from agora_dedup import NearDuplicateIndex, sample_comments
+from agora_textfilter import CommentFilter, filter_counts, filter_summary
+from agora_digest import DIGEST_DIR, build_digest, load_digest, reaction_totals, save_digest
+from agora_summaries import SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, SummaryCache, request_summary
+from agora_threads import CommentForest, heaviest_threads, thread_mood
+from agora_emotions import REACTION_EMOTIONS, emotion_distribution, score_emotions
+from agora_cassette import authorize_sheets, open_cassette, openai_kwargs, reddit_kwargs
 import uuid
+from itertools import islice
 from PIL import Image
 import plotly.express as px
 import time
@@ -67,20 +85,12 @@ def add_button_glow():
     </style>
     """, unsafe_allow_html=True)
 
-def get_or_create_worksheet(sheet, name, headers):
-    try:
-        ws = sheet.worksheet(name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sheet.add_worksheet(title=name, rows="1000", cols="20")
-        ws.append_row(headers)
-    return ws
+def get_or_create_worksheet(storage, name, headers):
+    return storage.get_or_create(name, headers)
 
 def auto_trim_worksheet(ws, max_rows=1000):
-    data = ws.get_all_values()
-    if len(data) > max_rows:
-        keep = data[0:1] + data[-max_rows:]
-        ws.clear()
-        ws.update(keep)
+    # Only counts the append; evicted rows are archived and trimmed in bulk in the background
+    get_retention().note_append(ws, max_rows=max_rows)
 
 def headline_echo(text):
     st.markdown(f"""
@@ -182,11 +192,18 @@ def slow_reveal_sequence(contents, delay=1.5):
             func(text)
         time.sleep(delay)
 
+def load_frame(name):
+    # Shared across sessions; dropped on TTL expiry or whenever we write to the tab
+    return get_frame_cache().get(name, lambda: storage.load_frame(name))
+
 def load_reflections():
-    return pd.DataFrame(reflections_ws.get_all_records())
+    return load_frame("Reflections")
 
 def load_comment_reflections():
-    return pd.DataFrame(comment_reflections_ws.get_all_records())
+    return load_frame("CommentReflections")
+
+def load_reactions():
+    return load_frame("CommentReactions")
 
 def show_light_reflection(message="Reflection added to the Field."):
     st.markdown("""
@@ -237,9 +254,8 @@ def insert_field_memory():
 
 def save_headline_snapshot(post):
     # Prepare comments
-    submission = reddit.submission(id=post.id)
-    submission.comments.replace_more(limit=0)
-    top_comments = [c.body for c in submission.comments[:10]]
+    comment_tree = load_comment_tree(post.id)[0]
+    top_comments = [c.body for c in top_level_comments(comment_tree, 10)]
 
     # Prepare data
     post_id = str(uuid.uuid4())
@@ -255,49 +271,246 @@ def save_headline_snapshot(post):
         permalink
     ])
 
-def generate_ai_summary(headline, grouped_comments):
-    prompt = f"Headline: {headline}\n"
-    for label, comments in grouped_comments.items():
-        prompt += f"\n{label} Comments:\n"
-        for c in comments[:2]:
-            prompt += f"- {c['text']}\n"
-    prompt += "\nSummarize public sentiment in 2-3 sentences."
+def generate_ai_summary(headline, grouped_comments, subject=None):
+    # subject (a post id where there is one) + the quoted comments key the summary cache
+    def complete():
+        client = OpenAI(api_key=st.secrets["openai"]["api_key"], **openai_kwargs(cassette))
+        return request_summary(client, headline, grouped_comments)
     try:
-        client = OpenAI(api_key=st.secrets["openai"]["api_key"])
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a neutral news sentiment summarizer."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=250,
-            temperature=0.7,
+        return summary_cache.summarize(
+            subject or headline, grouped_comments, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, complete
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return f"Could not generate summary: {str(e)}"
 
-# --- Google Sheets ---
+def digest_summary(headline, grouped_comments):
+    # Errors propagate, so a failed summary is never saved into a digest
+    client = OpenAI(api_key=st.secrets["openai"]["api_key"], **openai_kwargs(cassette))
+    return summary_cache.summarize(
+        headline, grouped_comments, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION,
+        lambda: request_summary(client, headline, grouped_comments),
+    )
+
+# --- Google Sheets / Storage ---
 SCOPE = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
-client = gspread.authorize(creds)
-sheet = client.open("AgoraData")
 
-replies_ws = get_or_create_worksheet(sheet, "Replies", ["reflection_id", "reply", "timestamp"])
-reaction_ws = get_or_create_worksheet(sheet, "CommentReactions", ["headline", "comment_snippet", "reaction", "timestamp"])
-comment_reflections_ws = get_or_create_worksheet(sheet, "CommentReflections", ["field_name", "headline", "comment_snippet", "reflection", "emotion", "timestamp"])
-saved_posts_ws = get_or_create_worksheet(sheet, "SavedPosts", ["id", "title", "top_comments", "date_saved", "permalink"])
-field_names_ws = get_or_create_worksheet(sheet, "FieldNames", ["field_name", "timestamp"])
-feedback_ws = get_or_create_worksheet(sheet, "AI_Feedback", ["Headline", "Question", "AI Response", "Feedback", "Comment", "Timestamp"])
+@st.cache_resource
+def get_cassette():
+    # [cassette] mode = "record" / "replay" routes Reddit, OpenAI and Sheets traffic through fixtures
+    return open_cassette(st.secrets.get("cassette", {}))
+
+cassette = get_cassette()
+
+def open_agora_spreadsheet():
+    creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
+    client = authorize_sheets(creds, cassette)
+    return client.open("AgoraData")
+
+@st.cache_resource
+def get_write_queue():
+    # One write-behind queue per process; appends to Sheets are batched in the background
+    config = dict(st.secrets.get("write_queue", {}))
+    if not config.get("enabled", True):
+        return None
+    return WriteBehindQueue(
+        journal_path=config.get("journal_path", "agora_write_journal.jsonl"),
+        batch_size=config.get("batch_size", 50),
+        max_delay=config.get("max_delay", 2.0),
+    )
+
+@st.cache_resource
+def get_retention():
+    config = dict(st.secrets.get("retention", {}))
+    return RetentionManager(
+        archive_dir=config.get("archive_dir", "archive"),
+        slack=config.get("slack", 200),
+        interval=config.get("interval", 300),
+    )
+
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache(ttl=dict(st.secrets.get("cache", {})).get("ttl", 60))
+
+@st.cache_resource
+def get_delta_sync():
+    # Remembers how many rows of each tab we have seen; retention trims force a full reload
+    sync = DeltaSync()
+    get_retention().on_trim(lambda ws, evicted: sync.mark_shifted(ws.title))
+    return sync
+
+@st.cache_resource
+def get_storage():
+    # Authorize, open the spreadsheet and resolve every tab once per process;
+    # reruns reuse these handles without any Sheets metadata calls.
+    # [storage] backend = "sqlite" keeps data local; Sheets stays an optional sync target
+    storage = open_storage(st.secrets.get("storage", {}), open_agora_spreadsheet, get_write_queue(), get_delta_sync())
+    storage.bootstrap(AGORA_TABS)
+    storage.on_write(get_frame_cache().invalidate)
+    return storage
+
+storage = get_storage()
+reflections_ws = get_or_create_worksheet(storage, "Reflections", AGORA_TABS["Reflections"])
+replies_ws = get_or_create_worksheet(storage, "Replies", AGORA_TABS["Replies"])
+reaction_ws = get_or_create_worksheet(storage, "CommentReactions", AGORA_TABS["CommentReactions"])
+comment_reflections_ws = get_or_create_worksheet(storage, "CommentReflections", AGORA_TABS["CommentReflections"])
+saved_posts_ws = get_or_create_worksheet(storage, "SavedPosts", AGORA_TABS["SavedPosts"])
+field_names_ws = get_or_create_worksheet(storage, "FieldNames", AGORA_TABS["FieldNames"])
+feedback_ws = get_or_create_worksheet(storage, "AI_Feedback", AGORA_TABS["AI_Feedback"])
+
+@st.cache_resource
+def get_reaction_counters():
+    # Rebuilt from the raw CommentReactions log on a schedule to fix any drift
+    config = dict(st.secrets.get("counters", {}))
+    counters = ReactionCounters(config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")))
+    counters.start_rebuild_job(load_reactions, config.get("rebuild_interval", 600))
+    return counters
+
+reaction_counters = get_reaction_counters()
 
 
 # --- Reddit Setup ---
 reddit = praw.Reddit(
     client_id=st.secrets["reddit"]["client_id"],
     client_secret=st.secrets["reddit"]["client_secret"],
-    user_agent=st.secrets["reddit"]["user_agent"]
+    user_agent=st.secrets["reddit"]["user_agent"],
+    **reddit_kwargs(cassette)
 )
 
+SEARCH_TIMEOUT = 10  # seconds per subreddit search request
+SEARCH_WORKERS = dict(st.secrets.get("topic_search", {})).get("workers", 8)  # concurrent searches per process
+
+# Topic searches check out their own PRAW instance; PRAW isn't thread-safe
+reddit_pool = get_reddit_pool(st.secrets["reddit"], lambda: reddit_kwargs(cassette, timeout=SEARCH_TIMEOUT), max_size=SEARCH_WORKERS)
+
+@st.cache_resource
+def get_listing_cache():
+    # Shared by every session: one Reddit call per (subreddit, listing, query) per TTL window
+    config = dict(st.secrets.get("listing_cache", {}))
+    return ListingCache(
+        ttl=config.get("ttl", 300),
+        stale_ttl=config.get("stale_ttl", 900),
+        max_entries=config.get("max_entries", 512),
+    )
+
+listing_cache = get_listing_cache()
+
+@st.cache_resource
+def get_comment_cache():
+    # Flattened comment trees keyed by post id, shared by every view and session
+    config = dict(st.secrets.get("comment_cache", {}))
+    return ListingCache(
+        ttl=config.get("ttl", 120),
+        stale_ttl=config.get("stale_ttl", 600),
+        max_entries=config.get("max_entries", 256),
+    )
+
+comment_cache = get_comment_cache()
+
+@st.cache_resource
+def get_ingest_store():
+    # Filled by agora_ingest.py running as its own process; read-only here
+    config = dict(st.secrets.get("ingest", {}))
+    if not config.get("enabled", True):
+        return None
+    return IngestStore(config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")))
+
+ingest_store = get_ingest_store()
+INGEST_MAX_AGE = dict(st.secrets.get("ingest", {})).get("max_age", 900)
+
+@st.cache_resource
+def get_search_index():
+    # Local FTS index over everything fetched here or by the ingestion worker
+    config = dict(st.secrets.get("search", {}))
+    if not config.get("enabled", True):
+        return None
+    return SearchIndex(
+        config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")),
+        half_life_hours=config.get("half_life_hours", 48),
+        comment_weight=config.get("comment_weight", 0.5),
+    )
+
+search_index = get_search_index()
+
+# [sentiment] backend picks the scorer and its label thresholds
+sentiment_backend = get_backend(st.secrets.get("sentiment", {}))
+
+@st.cache_resource
+def get_sentiment_cache():
+    # Scores keyed by (comment id, body hash, model version), shared by every view and the worker
+    config = dict(st.secrets.get("sentiment", {}))
+    return SentimentCache(
+        config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")),
+        max_entries=config.get("max_entries", 50000),
+        backend=sentiment_backend,
+    )
+
+sentiment_cache = get_sentiment_cache()
+
+@st.cache_resource
+def get_summary_cache():
+    # AI summaries shared by every session; the same comments are never summarized twice within the TTL
+    config = dict(st.secrets.get("summaries", {}))
+    return SummaryCache(
+        config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")),
+        ttl=config.get("ttl", 6 * 3600),
+        max_entries=config.get("max_entries", 5000),
+    )
+
+summary_cache = get_summary_cache()
+
+@st.cache_resource
+def get_comment_filter():
+    # Settings only; every view and session shares it
+    return CommentFilter(**dict(st.secrets.get("comment_filter", {})))
+
+comment_filter = get_comment_filter()
+
+@st.cache_resource
+def get_mood_cache():
+    # Thread moods keyed by (post id, tree version); a refetched tree gets a new key,
+    # so entries only need to live long enough to be reused across reruns
+    return ListingCache(ttl=3600, stale_ttl=0, max_entries=256)
+
+mood_cache = get_mood_cache()
+
+def load_listing(sub, listing="hot", limit=15):
+    # Pre-ingested listing when the worker has it fresh, otherwise ask Reddit
+    posts = ingest_store.recent_posts(sub, listing, limit, INGEST_MAX_AGE) if ingest_store else None
+    if posts is None:
+        posts = fetch_listing(reddit, sub, listing, limit=limit, cache=listing_cache)
+        if search_index:
+            search_index.add_posts(posts)
+    return posts
+
+def load_comment_tree(post_id):
+    # (records, {comment id: polarity}, version); polarity is only known for ingested
+    # trees, and version changes whenever the tree is fetched or ingested again
+    ingested = ingest_store.comment_tree(post_id, INGEST_MAX_AGE) if ingest_store else None
+    if ingested is None:
+        records = fetch_comment_tree(reddit, post_id, cache=comment_cache)
+        if search_index:
+            search_index.add_comments(post_id, records)
+        return records, {}, ("reddit", comment_cache.fetched_at(("comments", post_id)))
+    return ingested + (("ingest", ingest_store.tree_ingested_at(post_id)),)
+
+def load_thread_mood(post_id, records, polarity, version):
+    # (CommentForest, ThreadMood) for one version of a comment tree; reruns reuse it
+    # instead of filtering, scoring and folding the whole tree again
+    def compute():
+        tree_polarity = dict(polarity)
+        tree_unscored = [(c.id, text) for c, text in comment_filter.run(records) if c.id not in tree_polarity]
+        if tree_unscored:
+            tree_polarity.update(zip(
+                [i for i, _ in tree_unscored],
+                sentiment_cache.score([i for i, _ in tree_unscored], [t for _, t in tree_unscored])[0].tolist(),
+            ))
+        forest = CommentForest(records)
+        depth_discount = dict(st.secrets.get("threads", {})).get("depth_discount", 0.7)
+        return forest, thread_mood(forest, forest.polarities(tree_polarity), depth_discount)
+    if version[1] is None:
+        return compute()
+    return mood_cache.get(("mood", post_id) + version, compute)
+
 curated_subreddits = [
     "news", "worldnews", "politics", "uspolitics",
     "ukpolitics", "geopolitics", "europe", "MiddleEastNews",
@@ -373,6 +586,12 @@ if not st.session_state.field_name:
 view_mode = st.sidebar.radio("View Mode", ["Live View", "Morning Digest", "Ask Agora"])
 just_comments = st.sidebar.toggle("Just Comments Mode")
 
+ingest_health = ingest_store.health() if ingest_store else None
+if ingest_health:
+    ingest_minutes = int(ingest_health["age"] // 60)
+    ingest_state = "stale" if ingest_health["age"] > INGEST_MAX_AGE else ingest_health["state"]
+    st.sidebar.caption(f"Ingest: {ingest_state} · updated {ingest_minutes}m ago · {ingest_health['errors']} errors")
+
 # --- Main logic ---
 if view_mode == "Live View":
     add_fade_in_styles()
@@ -429,23 +648,36 @@ just human voices and emotional clarity.
     manual_subreddit = st.selectbox("Or pick a subreddit:", curated_subreddits, key="manual_subreddit_select")
 
     if topic:
-        for sub in curated_subreddits:
-            try:
-                for post in reddit.subreddit(sub).search(topic, sort="relevance", time_filter="week", limit=3):
-                    if not post.stickied and post.title not in post_dict:
-                        headline_options.append(post.title)
-                        post_dict[post.title] = post
-            except:
-                continue
+        # Answer from the local index first; Reddit is only searched on request or when nothing matches
+        search_posts = search_index.search(topic, limit=15) if search_index else []
+        search_live = st.checkbox("Also search Reddit live", key="search_live")
+        if search_live or not search_posts:
+            live_posts, search_failures = search_subreddits(reddit_pool, curated_subreddits, topic, limit=3, cache=listing_cache, timeout=SEARCH_TIMEOUT, max_workers=SEARCH_WORKERS)
+            if search_index:
+                search_index.add_posts(live_posts)
+            search_posts = search_posts + live_posts
+            if search_failures:
+                st.caption("Couldn't reach: " + ", ".join(f"r/{sub}" for sub in search_failures))
+        for post in search_posts:
+            if post.title not in post_dict:
+                headline_options.append(post.title)
+                post_dict[post.title] = post
     elif manual_subreddit:
         try:
-            for post in reddit.subreddit(manual_subreddit).hot(limit=15):
+            for post in load_listing(manual_subreddit, "hot", limit=15):
                 if not post.stickied and post.title not in post_dict:
                     headline_options.append(post.title)
                     post_dict[post.title] = post
         except:
             pass
 
+    # --- Collapse near-duplicate headlines into one story ---
+    story_index = NearDuplicateIndex(threshold=dict(st.secrets.get("dedup", {})).get("threshold", 0.5))
+    for title in headline_options:
+        story_index.add(post_dict[title])
+    story_members = {cluster[0].title: cluster for cluster in story_index.clusters()}
+    headline_options = list(story_members)
+
     if headline_options:
         selected_headline = st.radio("Select a headline:", headline_options, key="headline_radio")
     else:
@@ -455,10 +687,21 @@ just human voices and emotional clarity.
 # --- Display Comments + Reactions ---
     if selected_headline:
         post = post_dict[selected_headline]
-        submission = reddit.submission(id=post.id)
-        submission.comments.replace_more(limit=0)
-        comments = submission.comments[:30]
+        members = story_members.get(selected_headline, [post])
+        comment_tree, ingested_polarity, tree_version = load_comment_tree(post.id)
+        tree_polarity = dict(ingested_polarity)
+        comments = top_level_comments(comment_tree, 30)
+        if len(members) > 1:
+            # Same story in several subreddits: sample comments across (at most 3 of) them
+            member_trees = [comment_tree]
+            for member in members[1:3]:
+                member_tree, member_polarity, _ = load_comment_tree(member.id)
+                member_trees.append(member_tree)
+                ingested_polarity.update(member_polarity)
+            comments = sample_comments([top_level_comments(t, 30) for t in member_trees], 30)
         st.markdown(f"### 📰 {selected_headline}")
+        if len(members) > 1:
+            st.caption("Also posted in " + ", ".join(f"r/{m.subreddit}" for m in members[1:]))
 
     if comments:
         # --- Top Comment ---
@@ -478,15 +721,26 @@ just human voices and emotional clarity.
         emotion_counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
         emotion_groups = defaultdict(list)
 
-        for comment in comments:
-            text = comment.body.strip()
-            if not text or len(text) < 10:
-                continue
-            polarity = TextBlob(text).sentiment.polarity
-            label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
+        # The ingestion worker has usually scored these already; the rest are scored in one batch
+        # Markdown, URLs, quotes, bots, deleted and duplicate comments are dropped before scoring
+        filtered = filter_counts()
+        scored = comment_filter.filter(comments, filtered)
+        if filter_summary(filtered):
+            st.caption(f"Filtered out: {filter_summary(filtered)}")
+        unscored = [(c.id, text) for c, text in scored if c.id not in ingested_polarity]
+        batch_polarities = iter(sentiment_cache.score([i for i, _ in unscored], [t for _, t in unscored])[0])
+
+        for comment, text in scored:
+            polarity = ingested_polarity.get(comment.id)
+            if polarity is None:
+                polarity = float(next(batch_polarities))
+            label = sentiment_backend.label_for(polarity)
             emotion_counts[label] += 1
             emotion_groups[label].append({
+                "id": comment_key(comment),
+                # The clean text goes to scoring and the summary prompt; "body" is what readers see
                 "text": text,
+                "body": comment.body.strip(),
                 "score": round(polarity, 3),
                 "author": str(comment.author),
                 "created": datetime.utcfromtimestamp(comment.created_utc).strftime("%Y-%m-%d %H:%M")
@@ -495,11 +749,49 @@ just human voices and emotional clarity.
         # --- AI Summary ---
         if not just_comments:
             with st.spinner("Gathering the emotional field..."):
-                summary = generate_ai_summary(selected_headline, emotion_groups)
+                summary = generate_ai_summary(selected_headline, emotion_groups, subject=post.id)
                 st.success(summary)
 
         # --- Load Reactions ---
-        all_reactions = pd.DataFrame(reaction_ws.get_all_records())
+        # Pre-aggregated counts for this post; each comment below is a dict lookup
+        reaction_counts = reaction_counters.for_post(post.id, selected_headline)
+
+        # --- Thread Mood ---
+        # Every reply in the tree counts, weighted by its score and discounted by depth
+        if not just_comments and comment_tree:
+            thread_config = dict(st.secrets.get("threads", {}))
+            forest, mood = load_thread_mood(post.id, comment_tree, tree_polarity, tree_version)
+            if mood.polarity is not None:
+                top_level_text = (
+                    f" · top-level only: {sentiment_backend.label_for(mood.top_level)} ({mood.top_level:+.2f})"
+                    if mood.top_level is not None else ""
+                )
+                st.caption(
+                    f"Thread mood across {mood.comments} comments: "
+                    f"{sentiment_backend.label_for(mood.polarity)} ({mood.polarity:+.2f}){top_level_text}"
+                )
+                with st.expander("Thread mood by conversation"):
+                    st.table(pd.DataFrame([
+                        {
+                            "Comment": record.body.strip()[:SNIPPET_LENGTH],
+                            "Replies": replies,
+                            "Mood": f"{sentiment_backend.label_for(polarity)} ({polarity:+.2f})",
+                        }
+                        for record, polarity, replies in heaviest_threads(forest, mood.subtrees, thread_config.get("conversations", 5))
+                    ]))
+
+        # --- Comment Emotions vs Reactions ---
+        # Comments scored on the reaction axes, side by side with how people actually reacted
+        if not just_comments and scored:
+            comment_mood = emotion_distribution(score_emotions([text for _, text in scored]), REACTION_EMOTIONS)
+            reaction_totals = reaction_counts.totals()
+            reaction_sum = sum(reaction_totals.get(e, 0) for e in REACTION_EMOTIONS)
+            mood_df = pd.DataFrame({
+                "Comments": [comment_mood[e] for e in REACTION_EMOTIONS],
+                "Reactions": [reaction_totals.get(e, 0) / reaction_sum if reaction_sum else 0.0 for e in REACTION_EMOTIONS],
+            }, index=[f"{reaction_emojis[e]} {e}" for e in REACTION_EMOTIONS])
+            with st.expander("Comment emotions vs. reactions"):
+                st.bar_chart(mood_df)
 
         # --- Display Comments Grouped ---
         for label in ["Positive", "Neutral", "Negative"]:
@@ -517,9 +809,9 @@ just human voices and emotional clarity.
                 """, unsafe_allow_html=True)
 
                 for i, comment in enumerate(group[:10]):
-                    comment_text = comment.get("text", "")
-                    comment_id = str(hash(comment_text))[:8]
-                    snippet = comment_text[:100]
+                    comment_text = comment.get("body", "")
+                    comment_id = comment["id"]
+                    snippet = comment_text[:SNIPPET_LENGTH]
 
                     st.markdown(f"""
                     <div class='comment-block'>
@@ -530,8 +822,7 @@ just human voices and emotional clarity.
 
                     # --- Emoji Reaction Counters ---
                     if not just_comments:
-                        comment_reacts = all_reactions[all_reactions["comment_snippet"] == snippet]
-                        counts = comment_reacts["reaction"].value_counts().to_dict()
+                        counts = reaction_counts.get(comment_id, snippet)
                         emoji_counts = "  ".join(
                             f"{reaction_emojis[r]} {count}" for r, count in counts.items() if r in reaction_emojis
                         )
@@ -554,15 +845,20 @@ just human voices and emotional clarity.
                             if st.form_submit_button("Submit"):
                                 timestamp = datetime.utcnow().isoformat()
                                 if selected_reaction.strip():
-                                    reaction_ws.append_row([
-                                        selected_headline, snippet, selected_reaction, timestamp
-                                    ])
+                                    # Raw row first, then the counter; a rebuild loading meanwhile replays the bump
+                                    reaction_counters.record(
+                                        selected_headline, post.id, comment_id, selected_reaction,
+                                        append=lambda: reaction_ws.append_row([
+                                            selected_headline, snippet, selected_reaction, timestamp, post.id, comment_id
+                                        ]),
+                                    )
                                     auto_trim_worksheet(reaction_ws)
                                     st.success(f"Reaction recorded: {reaction_emojis[selected_reaction]} {selected_reaction}")
 
                                 if reflection.strip():
                                     comment_reflections_ws.append_row([
-                                        selected_headline, snippet, reflection.strip(), timestamp
+                                        st.session_state.field_name, selected_headline, snippet,
+                                        reflection.strip(), selected_reaction, timestamp, post.id, comment_id
                                     ])
                                     auto_trim_worksheet(comment_reflections_ws)
                                     st.success("Reflection submitted.")
@@ -579,66 +875,59 @@ elif view_mode == "Morning Digest":
     today = datetime.utcnow().date()
     yesterday = today - timedelta(days=1)
 
-    # --- Load Data ---
-    reflections_df = pd.DataFrame(comment_reflections_ws.get_all_records())
-    reactions_df = pd.DataFrame(reaction_ws.get_all_records())
-
-    # --- Clean and Filter ---
-    reflections_df["timestamp"] = pd.to_datetime(reflections_df["timestamp"], errors="coerce")
-    reflections_df["date"] = reflections_df["timestamp"].dt.date
-    yesterday_data = reflections_df[reflections_df["date"] == yesterday]
+    # --- Load Digest ---
+    # Normally built overnight by agora_digest.py; otherwise the first visitor builds it from the
+    # cached frames and saves it as provisional, so the nightly run still replaces it
+    digest_config = dict(st.secrets.get("digest", {}))
+    digest_dir = digest_config.get("dir", DIGEST_DIR)
+    digest = load_digest(yesterday, digest_dir)
+    if digest is None or not digest.get("complete"):
+        with st.spinner("Gathering yesterday's reflections..."):
+            totals = reaction_totals(load_reactions(), yesterday)
+            digest = build_digest(
+                load_comment_reflections(), yesterday, digest_summary, lambda headline: totals.get(headline, {}),
+                top_n=digest_config.get("top", 3), samples=digest_config.get("samples", 3),
+            )
+        digest["provisional"] = True
+        if digest["complete"]:
+            save_digest(digest, digest_dir)
 
-    if yesterday_data.empty:
+    reveal_delay = digest_config.get("reveal_delay", 0.5)
+    if not digest["headlines"]:
         slow_reveal_sequence([
             (centered_header, "Agora Morning Digest"),
             (centered_paragraph, "No reflections were recorded yesterday. The Field was silent."),
-        ], delay=1.5)
+        ], delay=reveal_delay)
     else:
         slow_reveal_sequence([
             (centered_header, "Agora Morning Digest"),
             (centered_paragraph, "Glimpses into the Field from yesterday's thoughts."),
-        ], delay=1.5)
+        ], delay=reveal_delay)
 
         # --- Top Headlines from Yesterday ---
-        top_headlines = yesterday_data["headline"].value_counts().head(3).index.tolist()
-
-        for headline in top_headlines:
+        emoji_map = {
+            "Angry": "😡", "Sad": "😢", "Hopeful": "🌈",
+            "Confused": "😕", "Neutral": "😐"
+        }
+        for item in digest["headlines"]:
             golden_divider()
 
-            # --- Subset reflections ---
-            subset = yesterday_data[yesterday_data["headline"] == headline]
-            grouped = {"Reflections": [{"text": r} for r in subset["reflection"].tolist()]}
-
             # --- Reactions ---
-            headline_reacts = reactions_df[reactions_df["headline"] == headline]
-            emoji_map = {
-                "Angry": "😡", "Sad": "😢", "Hopeful": "🌈",
-                "Confused": "😕", "Neutral": "😐"
-            }
-            counts = headline_reacts["reaction"].value_counts().to_dict()
             emoji_counts = "  ".join(
-                f"{emoji_map[r]} {count}" for r, count in counts.items() if r in emoji_map
+                f"{emoji_map[r]} {count}" for r, count in item["reactions"].items() if r in emoji_map
             )
 
             # --- Display ---
-            headline_echo(headline)
+            headline_echo(item["headline"])
             if emoji_counts:
                 st.markdown(f"<div style='text-align:center; color:#bbb; font-size:14px;'>Reactions: {emoji_counts}</div>", unsafe_allow_html=True)
 
-            with st.spinner("Summarizing reflections..."):
-                try:
-                    summary = generate_ai_summary(headline, grouped)
-                except Exception as e:
-                    summary = f"Summary error: {str(e)}"
-
-            time.sleep(1)
-            centered_quote(summary)
-            time.sleep(1.5)
+            centered_quote(item["summary"] or "The Field is still gathering its thoughts on this one.")
 
             # Show a sample reflection if any
-            if not subset.empty:
-                sample = subset.sample(1).iloc[0]
-                st.markdown(f"<div style='font-size:15px; color:#aaa; margin-top:10px; text-align:center;'>📝 _\"{sample['reflection']}\"_</div>", unsafe_allow_html=True)
+            if item["samples"]:
+                sample = random.choice(item["samples"])
+                st.markdown(f"<div style='font-size:15px; color:#aaa; margin-top:10px; text-align:center;'>📝 _\"{sample}\"_</div>", unsafe_allow_html=True)
 
             insert_field_memory()
             st.markdown("<br><br>", unsafe_allow_html=True)
@@ -650,7 +939,7 @@ if view_mode == "Ask Agora" and "post_dict" not in st.session_state:
     default_subreddit = "news"
     try:
         st.info(f"Auto-loading top posts from r/{default_subreddit} for Ask Agora...")
-        posts = reddit.subreddit(default_subreddit).hot(limit=10)
+        posts = load_listing(default_subreddit, "hot", limit=10)
         headline_options = []
         post_dict = {}
 
@@ -680,16 +969,14 @@ elif view_mode == "Ask Agora":
             selected_title = st.selectbox("Choose a headline to explore:", headlines)
             selected_post = post_dict[selected_title]
 
-            submission = reddit.submission(id=selected_post.id)
-            submission.comments.replace_more(limit=0)
-            top_comments = sorted(submission.comments.list(), key=lambda c: getattr(c, 'score', 0), reverse=True)
-            top_comments = [c for c in top_comments if len(c.body.strip()) > 10][:10]
+            comment_tree = load_comment_tree(selected_post.id)[0]
+            top_comments = sorted(comment_tree, key=lambda c: c.score, reverse=True)
+            # Stops filtering as soon as ten usable comments are found
+            top_comments = list(islice(comment_filter.run(top_comments), 10))
 
             grouped = {"Positive": [], "Neutral": [], "Negative": []}
-            for comment in top_comments:
-                text = comment.body.strip()[:200]
-                polarity = TextBlob(text).sentiment.polarity
-                label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
+            texts = [text[:200] for _, text in top_comments]
+            for text, label in zip(texts, sentiment_cache.score([c.id for c, _ in top_comments], texts)[1]):
                 grouped[label].append(f'"{text}"')
 
             grouped_summary = ""
@@ -698,7 +985,7 @@ elif view_mode == "Ask Agora":
                     grouped_summary += f"{label} Comments:\n" + "\n".join(grouped[label]) + "\n\n"
 
             try:
-                sentiment_summary = generate_ai_summary(selected_title, emotion_groups)
+                sentiment_summary = generate_ai_summary(selected_title, emotion_groups, subject=selected_post.id)
             except:
                 sentiment_summary = "Sentiment data is not yet available."
 
@@ -736,7 +1023,7 @@ Answer as a thoughtful assistant helping the user understand the range of emotio
 """
 
                 try:
-                    openai_client = OpenAI(api_key=st.secrets["openai"]["api_key"])
+                    openai_client = OpenAI(api_key=st.secrets["openai"]["api_key"], **openai_kwargs(cassette))
                     response = openai_client.chat.completions.create(
                         model="gpt-4",
                         messages=[{"role": "user", "content": prompt}]
@@ -782,19 +1069,17 @@ elif view_mode == "Ask Agora":
             selected_title = st.selectbox("Choose a headline to explore:", headlines)
             selected_post = post_dict[selected_title]
 
-            submission = reddit.submission(id=selected_post.id)
-            submission.comments.replace_more(limit=0)
-            top_comments = sorted(submission.comments.list(), key=lambda c: getattr(c, 'score', 0), reverse=True)
-            top_comments = [c for c in top_comments if len(c.body.strip()) > 10][:10]
+            comment_tree = load_comment_tree(selected_post.id)[0]
+            top_comments = sorted(comment_tree, key=lambda c: c.score, reverse=True)
+            top_comments = list(islice(comment_filter.run(top_comments), 10))
 
             comment_summary = ""
-            for i, comment in enumerate(top_comments, 1):
-                polarity = TextBlob(comment.body).sentiment.polarity
-                label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
-                comment_summary += f"{i}. \"{comment.body.strip()[:200]}\" ({label})\n"
+            labels = sentiment_cache.score([c.id for c, _ in top_comments], [text for _, text in top_comments])[1]
+            for i, ((comment, text), label) in enumerate(zip(top_comments, labels), 1):
+                comment_summary += f"{i}. \"{text[:200]}\" ({label})\n"
 
             try:
-                sentiment_summary = generate_ai_summary(selected_title, emotion_groups)
+                sentiment_summary = generate_ai_summary(selected_title, emotion_groups, subject=selected_post.id)
             except:
                 sentiment_summary = "Sentiment data is not yet available."
 
@@ -833,7 +1118,7 @@ Answer as a thoughtful assistant helping the user understand online sentiment an
 """
 
                 try:
-                    openai_client = OpenAI(api_key=st.secrets["openai"]["api_key"])
+                    openai_client = OpenAI(api_key=st.secrets["openai"]["api_key"], **openai_kwargs(cassette))
                     response = openai_client.chat.completions.create(
                         model="gpt-4",
                         messages=[{"role": "user", "content": prompt}]
@@ -1,7 +1,7 @@
 
 import streamlit as st
 import praw
-from textblob import TextBlob
+from agora_sentiment import get_backend
 from collections import defaultdict
 import pandas as pd
 import gspread
@@ -9,6 +9,7 @@ from google.oauth2.service_account import Credentials
 from datetime import datetime
 import uuid
 from openai import OpenAI
+from agora_reddit import get_reddit_pool, search_subreddits
 
 # --- AI Summary using OpenAI >=1.0.0 format ---
 def generate_ai_summary(headline, grouped_comments):
@@ -63,6 +64,12 @@ reddit = praw.Reddit(
     user_agent=st.secrets["reddit"]["user_agent"]
 )
 
+SEARCH_TIMEOUT = 10  # seconds per subreddit search request
+SEARCH_WORKERS = dict(st.secrets.get("topic_search", {})).get("workers", 8)  # concurrent searches per process
+
+# Topic searches check out their own PRAW instance; PRAW isn't thread-safe
+reddit_pool = get_reddit_pool(st.secrets["reddit"], lambda: {"requestor_kwargs": {"timeout": SEARCH_TIMEOUT}}, max_size=SEARCH_WORKERS)
+
 # --- Curated Subreddits for Topic Search ---
 curated_subreddits = [
     "news", "worldnews", "politics", "uspolitics", "ukpolitics",
@@ -86,15 +93,12 @@ post_dict = {}
 search_results = []
 
 if topic:
-    for sub in curated_subreddits:
-        try:
-            for post in reddit.subreddit(sub).search(topic, sort="relevance", time_filter="week", limit=2):
-                if not post.stickied:
-                    headline_options.append(post.title)
-                    post_dict[post.title] = post
-                    search_results.append(post)
-        except Exception:
-            continue
+    search_results, search_failures = search_subreddits(reddit_pool, curated_subreddits, topic, limit=2, timeout=SEARCH_TIMEOUT, max_workers=SEARCH_WORKERS)
+    for post in search_results:
+        headline_options.append(post.title)
+        post_dict[post.title] = post
+    if search_failures:
+        st.caption("Couldn't reach: " + ", ".join(f"r/{sub}" for sub in search_failures))
 
     page_size = 5
     total_pages = len(headline_options) // page_size + int(len(headline_options) % page_size > 0)
@@ -156,22 +160,13 @@ if selected_headline:
         "Negative": "🔴 😠"
     }
 
-    for comment in comments:
-        text = comment.body.strip()
+    texts = [comment.body.strip() for comment in comments]
+    polarities, labels = get_backend(st.secrets.get("sentiment", {})).score(texts)
+    for comment, text, polarity, label in zip(comments, texts, polarities.tolist(), labels):
         if not text or len(text) < 10:
             filtered_out += 1
             continue
 
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-
-        if polarity > 0.1:
-            label = "Positive"
-        elif polarity < -0.1:
-            label = "Negative"
-        else:
-            label = "Neutral"
-
         emotion_counts[label] += 1
         emotion_groups[label].append({
             "text": text,
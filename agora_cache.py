@@ -0,0 +1,66 @@
+# --- Agora Frame Cache ---
+# Process-wide read-through cache for worksheet DataFrames. Every session and
+# rerun shares one copy per tab; an entry is dropped when its TTL runs out or
+# as soon as our own code writes to that tab (storage.on_write -> invalidate).
+# A load that overlaps an invalidation is returned to its caller but not
+# cached, so a frame read before our write never outlives it.
+
+import threading
+import time
+
+
+class FrameCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}    # name -> (expires_at, DataFrame)
+        self.loading = {}    # name -> Lock, so concurrent misses load once
+        self.generations = {}  # name -> count of invalidations of that tab
+        self.epoch = 0         # count of invalidate() of every tab
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, name, loader):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1].copy()
+            load_lock = self.loading.setdefault(name, threading.Lock())
+        with load_lock:
+            # Another thread may have filled the entry while we waited
+            with self.lock:
+                entry = self.entries.get(name)
+                if entry and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return entry[1].copy()
+                self.misses += 1
+                generation = (self.epoch, self.generations.get(name, 0))
+            frame = loader()
+            with self.lock:
+                if generation == (self.epoch, self.generations.get(name, 0)):
+                    self.entries[name] = (time.monotonic() + self.ttl, frame)
+        return frame.copy()
+
+    def invalidate(self, name=None):
+        with self.lock:
+            if name is None:
+                self.entries.clear()
+                self.epoch += 1
+            else:
+                self.entries.pop(name, None)
+                self.generations[name] = self.generations.get(name, 0) + 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "cached": sorted(self.entries),
+            }
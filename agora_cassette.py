@@ -0,0 +1,249 @@
+# --- Agora Cassettes ---
+# Transport-level record/replay for the Reddit, OpenAI and Google Sheets
+# clients, so performance work can run offline and reproducibly.
+#
+#   mode = "record"  real HTTP calls; every response is also written to disk
+#   mode = "replay"  responses come from disk only; no network access at all
+#
+# One fixture file per distinct request (method, URL, body); repeated
+# requests are recorded in order and replayed in the same order. Replays can
+# add a fixed delay and/or a multiple of the recorded latency.
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Token endpoints: matched on URL alone (their bodies carry fresh signed
+# assertions) and stripped of the issued token before it reaches disk
+TOKEN_URLS = ("/api/v1/access_token", "oauth2.googleapis.com/token")
+
+# Values that differ on every run (write timestamps from datetime.utcnow(),
+# uuid4 reflection ids) are masked before a request body is matched, so
+# Sheets appends replay too
+VOLATILE_BODY = re.compile(
+    rb"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+    rb"|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
+    re.IGNORECASE,
+)
+
+# Bodies are stored decoded, so transfer headers no longer apply
+DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "set-cookie"}
+
+
+class Cassette:
+    def __init__(self, directory="fixtures/cassettes", mode="replay", latency=0.0, latency_scale=0.0):
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.recorded = {}   # key -> interactions recorded this run
+        self.positions = {}  # key -> next interaction to replay
+        self.metrics = {"recorded": 0, "replayed": 0, "misses": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    # --- Matching and storage ---
+    def key(self, method, url, body):
+        if any(token in url for token in TOKEN_URLS):
+            body = b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        body = VOLATILE_BODY.sub(b"*", body or b"")
+        digest = hashlib.sha256(method.upper().encode() + b" " + url.encode() + b"\n" + (body or b"")).hexdigest()
+        host = re.sub(r"[^\w.-]", "_", urlsplit(url).hostname or "local")
+        return f"{host}-{digest[:20]}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def record(self, key, method, url, status, headers, content, elapsed):
+        if any(token in url for token in TOKEN_URLS):
+            content = scrub_token(content)
+        interaction = {
+            "method": method,
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS},
+            "elapsed": elapsed,
+        }
+        try:
+            interaction["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["base64"] = base64.b64encode(content).decode("ascii")
+        with self.lock:
+            # A recording run replaces whatever an earlier run stored for this request
+            interactions = self.recorded.setdefault(key, [])
+            interactions.append(interaction)
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(interactions, f, indent=1)
+            os.replace(tmp, self._path(key))
+            self.metrics["recorded"] += 1
+
+    def replay(self, key, method, url):
+        # (status, headers, content) of the next recorded response; None if never recorded
+        path = self._path(key)
+        with self.lock:
+            if not os.path.exists(path):
+                self.metrics["misses"] += 1
+                return None
+            with open(path, encoding="utf-8") as f:
+                interactions = json.load(f)
+            position = self.positions.get(key, 0)
+            # Past the end of the recording, keep serving the last response
+            interaction = interactions[min(position, len(interactions) - 1)]
+            self.positions[key] = position + 1
+            self.metrics["replayed"] += 1
+        delay = self.latency + self.latency_scale * interaction.get("elapsed", 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if "base64" in interaction:
+            content = base64.b64decode(interaction["base64"])
+        else:
+            content = interaction["text"].encode("utf-8")
+        return interaction["status"], interaction["headers"], content
+
+    def stats(self):
+        with self.lock:
+            return dict(self.metrics, mode=self.mode)
+
+    # --- Client hooks ---
+    def requests_session(self, session=None):
+        session = session or requests.Session()
+        adapter = CassetteAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def httpx_client(self):
+        return httpx.Client(transport=CassetteTransport(self))
+
+
+def scrub_token(content):
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return content
+    if isinstance(payload, dict):
+        for field in ("access_token", "id_token", "refresh_token"):
+            if field in payload:
+                payload[field] = "cassette-token"
+    return json.dumps(payload).encode("utf-8")
+
+
+# --- requests (praw, gspread) ---
+class CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        key = self.cassette.key(request.method, request.url, request.body)
+        if self.cassette.mode == "replay":
+            replayed = self.cassette.replay(key, request.method, request.url)
+            if replayed is None:
+                raise requests.exceptions.ConnectionError(
+                    f"cassette miss: {request.method} {request.url}", request=request
+                )
+            status, headers, content = replayed
+            response = requests.Response()
+            response.status_code = status
+            response.headers = CaseInsensitiveDict(headers)
+            response._content = content
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            response.reason = requests.status_codes._codes.get(status, ("",))[0].upper()
+            return response
+        response = super().send(request, **kwargs)
+        self.cassette.record(
+            key, request.method, request.url, response.status_code, response.headers,
+            response.content, response.elapsed.total_seconds(),
+        )
+        return response
+
+
+# --- httpx (OpenAI) ---
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self.inner = httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        url = str(request.url)
+        body = request.read()
+        key = self.cassette.key(request.method, url, body)
+        if self.cassette.mode == "replay":
+            replayed = self.cassette.replay(key, request.method, url)
+            if replayed is None:
+                raise httpx.ConnectError(f"cassette miss: {request.method} {url}", request=request)
+            status, headers, content = replayed
+            return httpx.Response(status, headers=headers, content=content, request=request)
+        started = time.monotonic()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        self.cassette.record(
+            key, request.method, url, response.status_code, response.headers,
+            content, time.monotonic() - started,
+        )
+        return httpx.Response(
+            response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS},
+            content=content,
+            request=request,
+        )
+
+    def close(self):
+        self.inner.close()
+
+
+# --- Wiring helpers (cassette may be None) ---
+def open_cassette(config):
+    # config is the [cassette] secrets table; AGORA_CASSETTE_MODE overrides its mode
+    config = dict(config or {})
+    mode = os.environ.get("AGORA_CASSETTE_MODE", config.get("mode", "off"))
+    if mode not in ("record", "replay"):
+        return None
+    return Cassette(
+        directory=config.get("dir", "fixtures/cassettes"),
+        mode=mode,
+        latency=float(os.environ.get("AGORA_CASSETTE_LATENCY", config.get("latency", 0.0))),
+        latency_scale=config.get("latency_scale", 0.0),
+    )
+
+
+def reddit_kwargs(cassette, timeout=None):
+    # Extra praw.Reddit(...) arguments routing every Reddit call through the cassette,
+    # and optionally capping each request at timeout seconds
+    requestor = {}
+    if cassette is not None:
+        requestor["session"] = cassette.requests_session()
+    if timeout is not None:
+        requestor["timeout"] = timeout
+    return {"requestor_kwargs": requestor} if requestor else {}
+
+
+def openai_kwargs(cassette):
+    if cassette is None:
+        return {}
+    return {"http_client": cassette.httpx_client()}
+
+
+def authorize_sheets(creds, cassette):
+    import gspread
+    if cassette is None:
+        return gspread.authorize(creds)
+    from google.auth.transport.requests import AuthorizedSession, Request
+    # Token refreshes go through the cassette too, so replays need no network
+    session = AuthorizedSession(creds, auth_request=Request(session=cassette.requests_session()))
+    return gspread.Client(creds, session=cassette.requests_session(session))
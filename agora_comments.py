@@ -0,0 +1,18 @@
+# --- Agora Comment Identity ---
+# Comment-level data (reactions, reflections, form keys) is keyed by the
+# Reddit fullname of the comment ("t1_...") and the post id, which stay the
+# same across restarts and replicas. Rows written before ids were recorded
+# only have the 100-char snippet, so they are indexed under that instead.
+
+SNIPPET_LENGTH = 100
+
+
+def comment_key(comment):
+    # Works for PRAW comments and for the comment dicts built by the views
+    if isinstance(comment, dict):
+        return comment.get("id", "")
+    return getattr(comment, "fullname", "") or f"t1_{comment.id}"
+
+
+def legacy_key(snippet):
+    return f"snippet:{snippet}"
@@ -0,0 +1,37 @@
+# --- Agora Config ---
+# Command-line workers (ingestion, digest builder) run outside Streamlit, so
+# they read the same .streamlit/secrets.toml the app uses.
+
+import os
+import tomllib
+
+SECRETS_PATH = os.environ.get("AGORA_SECRETS", os.path.join(".streamlit", "secrets.toml"))
+
+
+def load_secrets(path=SECRETS_PATH):
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def make_reddit(secrets):
+    import praw
+    return praw.Reddit(
+        client_id=secrets["reddit"]["client_id"],
+        client_secret=secrets["reddit"]["client_secret"],
+        user_agent=secrets["reddit"]["user_agent"],
+    )
+
+
+def open_spreadsheet(secrets):
+    import gspread
+    from google.oauth2.service_account import Credentials
+    creds = Credentials.from_service_account_info(
+        secrets["google_service_account"],
+        scopes=["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"],
+    )
+    return gspread.authorize(creds).open("AgoraData")
+
+
+def make_openai(secrets):
+    from openai import OpenAI
+    return OpenAI(api_key=secrets["openai"]["api_key"])
@@ -0,0 +1,151 @@
+# --- Agora Reaction Counters ---
+# Pre-aggregated (headline, post id, comment id, reaction) -> count table.
+# Every reaction write bumps its counter, so rendering reads counts directly
+# instead of filtering the raw CommentReactions log per comment. A periodic
+# rebuild from the raw log corrects any drift (failed writes, other replicas,
+# retention trims). Sheets I/O never runs under the lock; renders only wait
+# on local SQLite.
+
+import sqlite3
+import threading
+import time
+
+from agora_comments import legacy_key
+
+
+class CommentCounts:
+    def __init__(self, rows):
+        self.by_key = {}
+        for key, reaction, count in rows:
+            self.by_key.setdefault(key, {})[reaction] = count
+
+    def get(self, comment_id, snippet=None):
+        # {reaction: count}, including rows recorded before comment ids existed
+        counts = dict(self.by_key.get(comment_id, {}))
+        if snippet is not None:
+            for reaction, n in self.by_key.get(legacy_key(snippet), {}).items():
+                counts[reaction] = counts.get(reaction, 0) + n
+        return counts
+
+    def totals(self):
+        # {reaction: count} over every comment of the post
+        totals = {}
+        for counts in self.by_key.values():
+            for reaction, n in counts.items():
+                totals[reaction] = totals.get(reaction, 0) + n
+        return totals
+
+
+class ReactionCounters:
+    def __init__(self, path="agora.db"):
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reaction_counts (
+                headline TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                reaction TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (headline, post_id, comment_id, reaction)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_reaction_counts_post ON reaction_counts (post_id)")
+        self.conn.commit()
+        self.last_rebuild = None
+        self.rebuild_errors = 0
+        self.rebuilding = threading.Lock()  # one rebuild at a time
+        self.replay = None  # reactions recorded while a rebuild loads the raw log
+
+    def _bump(self, headline, post_id, comment_id, reaction, n):
+        self.conn.execute("""
+            INSERT INTO reaction_counts (headline, post_id, comment_id, reaction, count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (headline, post_id, comment_id, reaction)
+            DO UPDATE SET count = count + excluded.count
+        """, (headline, post_id or "", comment_id, reaction, n))
+
+    def record(self, headline, post_id, comment_id, reaction, n=1, append=None):
+        # append (optional) writes the raw log row first, outside the lock
+        if append is not None:
+            append()
+        with self.lock:
+            with self.conn:
+                self._bump(headline, post_id, comment_id, reaction, n)
+            if self.replay is not None:
+                self.replay.append((headline, post_id, comment_id, reaction, n))
+
+    def for_post(self, post_id, headline):
+        # Legacy rows have no post id, only the headline they were recorded under
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT comment_id, reaction, SUM(count) FROM reaction_counts
+                WHERE post_id = ? OR (post_id = '' AND headline = ?)
+                GROUP BY comment_id, reaction
+            """, (post_id, headline)).fetchall()
+        return CommentCounts(rows)
+
+    def for_headline(self, headline):
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT reaction, SUM(count) FROM reaction_counts
+                WHERE headline = ? GROUP BY reaction ORDER BY SUM(count) DESC
+            """, (headline,)).fetchall()
+        return dict(rows)
+
+    def rebuild(self, reactions_df, replay=()):
+        # Recompute every counter from the raw reaction log in one transaction,
+        # then re-apply replay, the reactions the log may not have caught yet
+        rows = []
+        if not reactions_df.empty and "reaction" in reactions_df.columns:
+            df = reactions_df.copy()
+            df = df[df["reaction"].astype(str).str.strip() != ""]
+            for column in ("headline", "post_id", "comment_id", "comment_snippet"):
+                df[column] = df[column].fillna("").astype(str) if column in df.columns else ""
+            legacy = df["comment_id"] == ""
+            df.loc[legacy, "comment_id"] = df.loc[legacy, "comment_snippet"].map(legacy_key)
+            grouped = df.groupby(["headline", "post_id", "comment_id", "reaction"]).size()
+            rows = [(*key, int(count)) for key, count in grouped.items()]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM reaction_counts")
+                self.conn.executemany(
+                    "INSERT INTO reaction_counts (headline, post_id, comment_id, reaction, count) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                for delta in replay:
+                    self._bump(*delta)
+            if self.replay is replay:
+                self.replay = None
+        self.last_rebuild = time.time()
+
+    def rebuild_from(self, load_reactions):
+        # The raw log is loaded outside the lock. Reactions recorded meanwhile may be
+        # missing from it, so they are replayed on top of the new counts; one that made
+        # it into both is counted twice until the next rebuild, never lost.
+        with self.rebuilding:
+            replay = []
+            with self.lock:
+                self.replay = replay
+            try:
+                reactions_df = load_reactions()
+            except Exception:
+                with self.lock:
+                    self.replay = None
+                raise
+            self.rebuild(reactions_df, replay)
+
+    def start_rebuild_job(self, load_reactions, interval=600):
+        # First rebuild runs inline so counts are correct from the first render
+        self.rebuild_from(load_reactions)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.rebuild_from(load_reactions)
+                except Exception:
+                    self.rebuild_errors += 1
+
+        threading.Thread(target=run, name="agora-counter-rebuild", daemon=True).start()
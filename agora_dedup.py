@@ -0,0 +1,153 @@
+# --- Agora Story De-duplication ---
+# The same story is posted to several subreddits under slightly different
+# titles. Posts are grouped into one story when they link the same canonical
+# URL, or when their titles are near-duplicates: MinHash signatures over
+# character shingles are bucketed with LSH, and candidate pairs are confirmed
+# with the exact Jaccard similarity of their shingle sets.
+
+import re
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|ref|ref_src|cmpid|smid|mc_\w+|ocid|taid|at_\w+)$")
+STOPWORDS = {"a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "as", "at", "by", "with", "from"}
+MERSENNE = (1 << 61) - 1
+
+
+def canonical_url(url):
+    # Host without www./m./amp., path without trailing slash or amp suffix, tracking
+    # params dropped. Links back into Reddit (self posts) have no canonical URL.
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    host = re.sub(r"^(www|m|amp|mobile)\.", "", host)
+    if not host or host.endswith("reddit.com") or host == "redd.it":
+        return None
+    path = re.sub(r"/(amp|index\.html?)?/?$", "", parts.path) or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k.lower())))
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+
+def title_shingles(title, k=4):
+    words = [w for w in re.findall(r"\w+", title.lower()) if w not in STOPWORDS]
+    text = " ".join(words)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    # Incremental: add() posts in display order; the first post of each story
+    # stays its representative, so listing order is preserved.
+    # bands/rows set the LSH threshold, roughly (1/bands)^(1/rows); tune both with
+    # threshold. max_bucket caps how many ids a bucket keeps as candidates.
+    def __init__(self, threshold=0.5, bands=20, rows=3, seed=1, max_bucket=None):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        rng = np.random.default_rng(seed)
+        self.perm_a = rng.integers(1, 1 << 31, size=bands * rows, dtype=np.uint64)
+        self.perm_b = rng.integers(0, 1 << 31, size=bands * rows, dtype=np.uint64)
+        self.parent = {}     # post id -> parent post id (union-find)
+        self.posts = {}      # post id -> post, in insertion order
+        self.order = {}      # post id -> insertion index
+        self.shingles = {}   # post id -> shingle set
+        self.by_url = {}     # canonical url -> first post id
+        self.buckets = {}    # (band, band signature) -> [post ids]
+        self.metrics = {"posts": 0, "url_matches": 0, "title_matches": 0, "candidates": 0}
+
+    def signature(self, shingles):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a*x + b) mod p for every permutation at once; stays below 2^64
+        return ((self.perm_a[:, None] * hashes[None, :] + self.perm_b[:, None]) % MERSENNE).min(axis=1)
+
+    def find(self, post_id):
+        root = post_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[post_id] != root:
+            self.parent[post_id], post_id = root, self.parent[post_id]
+        return root
+
+    def _union(self, keep, other):
+        keep, other = self.find(keep), self.find(other)
+        if keep == other:
+            return
+        # The earlier post stays the representative
+        if self.order[other] < self.order[keep]:
+            keep, other = other, keep
+        self.parent[other] = keep
+
+    def add(self, post):
+        # Returns the id of the story's representative post
+        if post.id in self.posts:
+            return self.find(post.id)
+        self.order[post.id] = len(self.posts)
+        self.posts[post.id] = post
+        self.parent[post.id] = post.id
+        self.metrics["posts"] += 1
+
+        url = canonical_url(getattr(post, "url", ""))
+        if url:
+            if url in self.by_url:
+                self.metrics["url_matches"] += 1
+                self._union(self.by_url[url], post.id)
+            else:
+                self.by_url[url] = post.id
+
+        shingles = title_shingles(post.title)
+        self.shingles[post.id] = shingles
+        if shingles:
+            sig = self.signature(shingles)
+            candidates = set()
+            for band in range(self.bands):
+                key = (band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                bucket = self.buckets.setdefault(key, [])
+                candidates.update(bucket)
+                if self.max_bucket is None or len(bucket) < self.max_bucket:
+                    bucket.append(post.id)
+            self.metrics["candidates"] += len(candidates)
+            for other in candidates:
+                if self.find(other) != self.find(post.id) and jaccard(shingles, self.shingles[other]) >= self.threshold:
+                    self.metrics["title_matches"] += 1
+                    self._union(other, post.id)
+        return self.find(post.id)
+
+    def clusters(self):
+        # [[representative, duplicates...], ...] in insertion order
+        groups = {}
+        for post_id, post in self.posts.items():
+            groups.setdefault(self.find(post_id), []).append(post)
+        return list(groups.values())
+
+
+def cluster_posts(posts, threshold=0.5):
+    index = NearDuplicateIndex(threshold=threshold)
+    for post in posts:
+        index.add(post)
+    return index.clusters()
+
+
+def sample_comments(trees, limit=30):
+    # Merge comment lists from every post of a story: best-scored first in
+    # each list, taken round-robin so no single subreddit dominates
+    ranked = [sorted(tree, key=lambda c: c.score, reverse=True) for tree in trees if tree]
+    merged, seen = [], set()
+    for i in range(max((len(t) for t in ranked), default=0)):
+        for tree in ranked:
+            if i < len(tree) and tree[i].body not in seen:
+                seen.add(tree[i].body)
+                merged.append(tree[i])
+                if len(merged) >= limit:
+                    return merged
+    return merged
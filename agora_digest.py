@@ -0,0 +1,153 @@
+# --- Agora Morning Digest Builder ---
+# Builds yesterday's Morning Digest once (top headlines by reflection count,
+# their reaction counts, an AI summary and a few sample reflections) and
+# saves it as digests/YYYY-MM-DD.json. Opening the digest in the app is then
+# a single file read instead of loading whole sheets and calling OpenAI.
+# Digests the app builds itself are saved as provisional; this script
+# replaces them with one built from the sheets.
+#
+#   python agora_digest.py                    # yesterday (UTC)
+#   python agora_digest.py --date 2024-05-01  # any day; --force rebuilds an existing digest
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from agora_storage import AGORA_TABS
+
+DIGEST_DIR = "digests"
+
+# Only the tabs the digest reads
+DIGEST_TABS = {name: AGORA_TABS[name] for name in ("CommentReactions", "CommentReflections")}
+
+
+def digest_path(day, directory=DIGEST_DIR):
+    return os.path.join(directory, f"{day.isoformat()}.json")
+
+
+def load_digest(day, directory=DIGEST_DIR):
+    try:
+        with open(digest_path(day, directory), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_digest(digest, directory=DIGEST_DIR):
+    # Write-then-rename, so the app never reads a half-written digest
+    os.makedirs(directory, exist_ok=True)
+    path = digest_path(date.fromisoformat(digest["date"]), directory)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(digest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def reaction_totals(reactions_df, day=None):
+    # {headline: {reaction: count}}, most frequent reaction first (as ReactionCounters.for_headline);
+    # with a day, only reactions timestamped that day count
+    if reactions_df.empty or "reaction" not in reactions_df.columns:
+        return {}
+    df = reactions_df[reactions_df["reaction"].astype(str).str.strip() != ""]
+    if day is not None:
+        if "timestamp" not in df.columns:
+            return {}
+        df = df[pd.to_datetime(df["timestamp"], errors="coerce").dt.date == day]
+    totals = {}
+    for (headline, reaction), n in df.groupby(["headline", "reaction"]).size().sort_values(ascending=False).items():
+        totals.setdefault(headline, {})[reaction] = int(n)
+    return totals
+
+
+def build_digest(reflections_df, day, summarize, reaction_counts, top_n=3, samples=3):
+    # summarize(headline, grouped) may raise; that headline is left without a summary
+    # and the digest is marked incomplete so it isn't saved as final
+    digest = {"date": day.isoformat(), "built_at": time.time(), "reflections": 0, "complete": True, "headlines": []}
+    if reflections_df.empty or "timestamp" not in reflections_df.columns:
+        return digest
+    stamps = pd.to_datetime(reflections_df["timestamp"], errors="coerce")
+    day_data = reflections_df[stamps.dt.date == day]
+    digest["reflections"] = len(day_data)
+    for headline in day_data["headline"].value_counts().head(top_n).index.tolist():
+        subset = day_data[day_data["headline"] == headline]
+        texts = [str(r) for r in subset["reflection"].tolist() if str(r).strip()]
+        grouped = {"Reflections": [{"text": r} for r in texts]}
+        try:
+            summary = summarize(headline, grouped)
+        except Exception as e:
+            summary = None
+            digest["complete"] = False
+            digest.setdefault("errors", []).append(f"{headline}: {type(e).__name__}: {e}")
+        sample = pd.Series(texts, dtype=object).sample(min(samples, len(texts))).tolist() if texts else []
+        digest["headlines"].append({
+            "headline": headline,
+            "reflections": len(subset),
+            "reactions": dict(reaction_counts(headline)),
+            "summary": summary,
+            "samples": sample,
+        })
+    return digest
+
+
+if __name__ == "__main__":
+    from agora_config import SECRETS_PATH, load_secrets, make_openai, open_spreadsheet
+    from agora_storage import open_storage
+    from agora_summaries import SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, SummaryCache, request_summary
+
+    parser = argparse.ArgumentParser(description="Build the Agora Morning Digest for one day.")
+    parser.add_argument("--date", type=date.fromisoformat, help="day to summarize (default: yesterday, UTC)")
+    parser.add_argument("--dir", help="directory digests are written to")
+    parser.add_argument("--top", type=int, help="number of headlines")
+    parser.add_argument("--force", action="store_true", help="rebuild even if a final digest exists")
+    parser.add_argument("--secrets", default=SECRETS_PATH)
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    config = dict(secrets.get("digest", {}))
+    directory = args.dir or config.get("dir", DIGEST_DIR)
+    day = args.date or datetime.utcnow().date() - timedelta(days=1)
+
+    existing = load_digest(day, directory)
+    # Provisional digests built by the app are always replaced
+    if existing and existing.get("complete") and not existing.get("provisional") and not args.force:
+        print(f"{digest_path(day, directory)} already built")
+        raise SystemExit(0)
+
+    storage = open_storage(secrets.get("storage", {}), lambda: open_spreadsheet(secrets))
+    storage.bootstrap(DIGEST_TABS)
+    totals = reaction_totals(storage.load_frame("CommentReactions"), day)
+
+    summary_config = dict(secrets.get("summaries", {}))
+    cache = SummaryCache(
+        summary_config.get("path", dict(secrets.get("storage", {})).get("path", "agora.db")),
+        ttl=summary_config.get("ttl", 6 * 3600),
+        max_entries=summary_config.get("max_entries", 5000),
+    )
+    client = make_openai(secrets)
+
+    def summarize(headline, grouped):
+        # Same cache key as the app's digest view, so either side can reuse the other's summary
+        return cache.summarize(
+            headline, grouped, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION,
+            lambda: request_summary(client, headline, grouped),
+        )
+
+    digest = build_digest(
+        storage.load_frame("CommentReflections"),
+        day,
+        summarize,
+        lambda headline: totals.get(headline, {}),
+        top_n=args.top or config.get("top", 3),
+        samples=config.get("samples", 3),
+    )
+    print(save_digest(digest, directory))
+    print(json.dumps({k: digest[k] for k in ("date", "reflections", "complete")}, indent=2))
+    if not digest["complete"]:
+        print("\n".join(digest["errors"]), file=sys.stderr)
+        raise SystemExit(1)
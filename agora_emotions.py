@@ -0,0 +1,194 @@
+# --- Agora Emotions ---
+# Scores comments on the same emotion axes people use in Agora: the reaction
+# buttons (Angry / Sad / Hopeful / Confused / Neutral) and the reflection
+# emotions (Angry / Hopeful / Skeptical / Confused / Inspired / Indifferent).
+# A batch of comments becomes one flat token array; each distinct token (and
+# each phrase n-gram) is resolved against the lexicon once, giving a sparse
+# bag-of-words (comment, lexicon entry, count). Its product with the entry ->
+# emotion weight matrix is the batch's emotion scores. Comment moods and
+# reaction counts can then be compared directly, without an LLM call.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from agora_sentiment import NEGATIONS, tokenize
+
+REACTION_EMOTIONS = ("Angry", "Sad", "Hopeful", "Confused", "Neutral")
+REFLECTION_EMOTIONS = ("Angry", "Hopeful", "Skeptical", "Confused", "Inspired", "Indifferent")
+EMOTIONS = ("Angry", "Sad", "Hopeful", "Confused", "Skeptical", "Inspired", "Indifferent", "Neutral")
+
+# Word forms per emotion; a trailing * matches any word starting with the stem,
+# so stems that begin unrelated words (heal- / health, hero / heroin,
+# admir- / admiral) are spelled out instead.
+# Phrases are tokenized like comments, so "don't care" matches "do n't care".
+# Generic question and hedge words (how, what, why, really, sure, ...) are left
+# out: they would pull nearly every question into Confused or Skeptical.
+EMOTION_LEXICON = {
+    "Angry": [
+        "anger*", "angry", "angrier", "furious", "fury", "rage*", "outrag*", "livid", "hate*", "hating",
+        "disgust*", "infuriat*", "pissed", "ridiculous", "pathetic", "shameful", "disgrace*",
+        "corrupt*", "idiot*", "stupid", "scum", "unacceptable", "unfair", "sick of", "fed up", "appalling", "bullshit",
+    ],
+    "Sad": [
+        "sad", "sadly", "sadden*", "heartbreak*", "heartbroken", "tragic", "tragedy", "grief", "grieve", "grieving", "grieved",
+        "mourn*", "depress*", "devastat*", "crying", "tears", "lonely", "sorrow*",
+        "awful", "horrible", "terrible", "unfortunate*", "condolence*", "rest in peace", "hopeless*",
+    ],
+    "Hopeful": [
+        "hope", "hoping", "hopeful*", "optimis*", "promising", "recover*",
+        "relief", "relieved", "glad", "good news", "encourag*", "looking forward",
+        "heal", "heals", "healing", "healed", "rebuild*", "step forward", "step in the right direction",
+    ],
+    "Confused": [
+        "confus*", "unclear", "huh", "puzzl*", "baffl*", "bewilder*", "perplex*", "bizarre",
+        "makes no sense", "doesn't make sense", "no idea", "what the", "i don't get",
+    ],
+    "Skeptical": [
+        "doubt*", "skeptic*", "sceptic*", "suspicious", "allegedly", "propaganda",
+        "misleading", "citation needed", "yeah right", "believe it when", "questionable",
+        "biased", "fake news", "lies", "lying", "dubious",
+    ],
+    "Inspired": [
+        "inspir*", "amazing", "incredible", "brave", "courage*", "hero", "heroes", "heroic", "wonderful",
+        "admire", "admired", "admiring", "admiration", "admirable", "proud", "legend*", "awesome", "brilliant", "uplifting", "kindness",
+        "generous", "selfless",
+    ],
+    "Indifferent": [
+        "whatever", "meh", "who cares", "don't care", "dont care", "couldn't care less", "boring",
+        "nothing new", "same old", "irrelevant", "so what", "shrug",
+    ],
+}
+
+
+class EmotionLexicon:
+    def __init__(self, lexicon=EMOTION_LEXICON, emotions=EMOTIONS, max_resolved=50000):
+        self.emotions = tuple(emotions)
+        column = {e: i for i, e in enumerate(self.emotions)}
+        self.vocab = {}     # exact word -> row
+        self.prefixes = []  # (stem, row)
+        self.phrases = {}   # n -> {space-joined tokens: row}
+        rows = []
+        for emotion, words in lexicon.items():
+            for word in words:
+                tokens = tokenize(word.rstrip("*"))
+                key = " ".join(tokens)
+                if len(tokens) > 1:
+                    table = self.phrases.setdefault(len(tokens), {})
+                elif word.endswith("*"):
+                    table = None
+                else:
+                    table = self.vocab
+                row = table.get(key) if table is not None else None
+                if row is None:
+                    row = len(rows)
+                    rows.append(np.zeros(len(self.emotions)))
+                    if table is None:
+                        self.prefixes.append((key, row))
+                    else:
+                        table[key] = row
+                rows[row][column[emotion]] = 1.0
+        # Lexicon entry -> emotion weights
+        self.matrix = np.vstack(rows) if rows else np.zeros((0, len(self.emotions)))
+        # Longest stems first so "hopeless*" wins over "hope*"
+        self.prefixes.sort(key=lambda p: len(p[0]), reverse=True)
+        # token -> row or -1, filled lazily; LRU-bounded, since comments bring endless new tokens
+        self.resolved = OrderedDict()
+        self.max_resolved = max_resolved
+        self.lock = threading.Lock()
+
+    def row_for(self, token):
+        with self.lock:
+            row = self.resolved.get(token)
+            if row is not None:
+                self.resolved.move_to_end(token)
+                return row
+        row = self.vocab.get(token, -1)
+        if row < 0:
+            row = next((r for stem, r in self.prefixes if token.startswith(stem)), -1)
+        with self.lock:
+            self.resolved[token] = row
+            while len(self.resolved) > self.max_resolved:
+                self.resolved.popitem(last=False)
+        return row
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_emotion_lexicon():
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = EmotionLexicon()
+    return _lexicon
+
+
+def _ngrams(tokens, docs, n):
+    # Space-joined n-grams that don't cross a comment boundary, and their comments
+    if len(tokens) < n:
+        return np.array([], dtype=str), np.array([], dtype=np.int64)
+    count = len(tokens) - n + 1
+    grams = tokens[:count]
+    for k in range(1, n):
+        grams = np.char.add(np.char.add(grams, " "), tokens[k:k + count])
+    same = docs[:count] == docs[n - 1:n - 1 + count]
+    return grams[same], docs[:count][same]
+
+
+def score_emotions(texts, lexicon=None):
+    # (n_texts, n_emotions) array of per-comment emotion shares; rows sum to 1.
+    # Comments with no emotional words count as fully Neutral.
+    lex = lexicon or get_emotion_lexicon()
+    n_docs = len(texts)
+    token_lists = [tokenize(text or "") for text in texts]
+    tokens = np.array([t for tl in token_lists for t in tl], dtype=str)
+    docs = np.repeat(np.arange(n_docs), [len(tl) for tl in token_lists])
+
+    hit_docs, hit_rows = [], []
+    if len(tokens):
+        # Every distinct token is looked up once
+        distinct, inverse = np.unique(tokens, return_inverse=True)
+        rows = np.fromiter((lex.row_for(t) for t in distinct), dtype=np.int64, count=len(distinct))[inverse]
+        # "not happy" is not evidence of Hopeful
+        negated = np.zeros(len(tokens), dtype=bool)
+        negated[1:] = np.isin(tokens[:-1], list(NEGATIONS)) & (docs[1:] == docs[:-1])
+        keep = (rows >= 0) & ~negated
+        hit_docs.append(docs[keep])
+        hit_rows.append(rows[keep])
+        for n, table in lex.phrases.items():
+            grams, gram_docs = _ngrams(tokens, docs, n)
+            found = np.isin(grams, list(table))
+            if found.any():
+                hit_docs.append(gram_docs[found])
+                hit_rows.append(np.fromiter((table[g] for g in grams[found]), dtype=np.int64, count=int(found.sum())))
+
+    scores = np.zeros((n_docs, len(lex.emotions)))
+    if hit_docs:
+        # Sparse bag of words: (comment, lexicon entry) -> count
+        n_rows = len(lex.matrix)
+        cells, counts = np.unique(np.concatenate(hit_docs) * n_rows + np.concatenate(hit_rows), return_counts=True)
+        bow_docs, bow_rows = cells // n_rows, cells % n_rows
+        # bag of words x lexicon matrix, one emotion column at a time
+        for e in range(len(lex.emotions)):
+            scores[:, e] = np.bincount(bow_docs, weights=counts * lex.matrix[bow_rows, e], minlength=n_docs)
+    totals = scores.sum(axis=1, keepdims=True)
+    neutral = lex.emotions.index("Neutral") if "Neutral" in lex.emotions else None
+    if neutral is not None:
+        scores[totals[:, 0] == 0, neutral] = 1.0
+        totals[totals == 0] = 1.0
+    return scores / np.maximum(totals, 1e-12)
+
+
+def dominant_emotions(scores, emotions=EMOTIONS):
+    return np.array(emotions, dtype=object)[np.asarray(scores).argmax(axis=1)]
+
+
+def emotion_distribution(scores, axes=REACTION_EMOTIONS, emotions=EMOTIONS):
+    # Share of the thread's emotion mass on the given axes (e.g. the reaction buttons)
+    columns = [emotions.index(a) for a in axes]
+    mass = np.asarray(scores)[:, columns].sum(axis=0)
+    total = mass.sum()
+    return {a: (float(m / total) if total else 0.0) for a, m in zip(axes, mass)}
@@ -4,7 +4,14 @@ import gspread
 from google.oauth2.service_account import Credentials
 import praw
 from openai import OpenAI
-from textblob import TextBlob
+from agora_reddit import ListingCache, fetch_comment_tree, get_reddit_pool, search_subreddits, top_level_comments
+from agora_storage import AGORA_TABS, open_storage
+from agora_write_queue import WriteBehindQueue
+from agora_retention import RetentionManager
+from agora_cache import FrameCache
+from agora_sync import DeltaSync
+from agora_comments import comment_key, SNIPPET_LENGTH
+from agora_sentiment import get_backend
 from datetime import datetime, timedelta
 from collections import defaultdict
 import uuid
@@ -17,29 +24,23 @@ from PIL import Image
 # --- Helper Functions ---
 # ----------------------
 
-def get_or_create_worksheet(sheet, name, headers):
-    try:
-        ws = sheet.worksheet(name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sheet.add_worksheet(title=name, rows="1000", cols="20")
-        ws.append_row(headers)
-    return ws
+def get_or_create_worksheet(storage, name, headers):
+    return storage.get_or_create(name, headers)
 
 def auto_trim_worksheet(ws, max_rows=1000):
-    data = ws.get_all_values()
-    num_rows = len(data)
-    if num_rows > max_rows:
-        # Keep headers + last max_rows rows
-        rows_to_keep = data[0:1] + data[-max_rows:]
-        ws.clear()
-        ws.update(rows_to_keep)
+    # Only counts the append; evicted rows are archived and trimmed in bulk in the background
+    get_retention().note_append(ws, max_rows=max_rows)
 
 # --- Data Loading ---
+def load_frame(name):
+    # Shared across sessions; dropped on TTL expiry or whenever we write to the tab
+    return get_frame_cache().get(name, lambda: storage.load_frame(name))
+
 def load_reflections():
-    return pd.DataFrame(reflections_ws.get_all_records())
+    return load_frame("Reflections")
 
 def load_replies():
-    return pd.DataFrame(replies_ws.get_all_records())
+    return load_frame("Replies")
 
 # --- AI and Summaries ---
 def generate_ai_summary(headline, grouped_comments):
@@ -241,13 +242,59 @@ st.markdown("""
 
 # --- Setup Services ---
 SCOPE = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
-client = gspread.authorize(creds)
-sheet = client.open("AgoraData")
-reflections_ws = get_or_create_worksheet(sheet, "Reflections", ["reflection_id", "headline", "emotions", "trust_level", "reflection", "timestamp"])
-replies_ws = get_or_create_worksheet(sheet, "Replies", ["reflection_id", "reply", "timestamp"])
-reaction_ws = get_or_create_worksheet(sheet, "CommentReactions", ["headline", "comment_snippet", "reaction", "timestamp"])
-comment_reflections_ws = get_or_create_worksheet(sheet, "CommentReflections", ["headline", "comment_snippet", "reflection", "timestamp"])
+
+def open_agora_spreadsheet():
+    creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
+    client = gspread.authorize(creds)
+    return client.open("AgoraData")
+
+@st.cache_resource
+def get_write_queue():
+    # One write-behind queue per process; appends to Sheets are batched in the background
+    config = dict(st.secrets.get("write_queue", {}))
+    if not config.get("enabled", True):
+        return None
+    return WriteBehindQueue(
+        journal_path=config.get("journal_path", "agora_write_journal.jsonl"),
+        batch_size=config.get("batch_size", 50),
+        max_delay=config.get("max_delay", 2.0),
+    )
+
+@st.cache_resource
+def get_retention():
+    config = dict(st.secrets.get("retention", {}))
+    return RetentionManager(
+        archive_dir=config.get("archive_dir", "archive"),
+        slack=config.get("slack", 200),
+        interval=config.get("interval", 300),
+    )
+
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache(ttl=dict(st.secrets.get("cache", {})).get("ttl", 60))
+
+@st.cache_resource
+def get_delta_sync():
+    # Remembers how many rows of each tab we have seen; retention trims force a full reload
+    sync = DeltaSync()
+    get_retention().on_trim(lambda ws, evicted: sync.mark_shifted(ws.title))
+    return sync
+
+@st.cache_resource
+def get_storage():
+    # Authorize, open the spreadsheet and resolve every tab once per process;
+    # reruns reuse these handles without any Sheets metadata calls.
+    # [storage] backend = "sqlite" keeps data local; Sheets stays an optional sync target
+    storage = open_storage(st.secrets.get("storage", {}), open_agora_spreadsheet, get_write_queue(), get_delta_sync())
+    storage.bootstrap(AGORA_TABS)
+    storage.on_write(get_frame_cache().invalidate)
+    return storage
+
+storage = get_storage()
+reflections_ws = get_or_create_worksheet(storage, "Reflections", AGORA_TABS["Reflections"])
+replies_ws = get_or_create_worksheet(storage, "Replies", AGORA_TABS["Replies"])
+reaction_ws = get_or_create_worksheet(storage, "CommentReactions", AGORA_TABS["CommentReactions"])
+comment_reflections_ws = get_or_create_worksheet(storage, "CommentReflections", AGORA_TABS["CommentReflections"])
 
 reddit = praw.Reddit(
     client_id=st.secrets["reddit"]["client_id"],
@@ -255,6 +302,36 @@ reddit = praw.Reddit(
     user_agent=st.secrets["reddit"]["user_agent"]
 )
 
+SEARCH_TIMEOUT = 10  # seconds per subreddit search request
+SEARCH_WORKERS = dict(st.secrets.get("topic_search", {})).get("workers", 8)  # concurrent searches per process
+
+# Topic searches check out their own PRAW instance; PRAW isn't thread-safe
+reddit_pool = get_reddit_pool(st.secrets["reddit"], lambda: {"requestor_kwargs": {"timeout": SEARCH_TIMEOUT}}, max_size=SEARCH_WORKERS)
+
+@st.cache_resource
+def get_listing_cache():
+    # Shared by every session: one Reddit call per (subreddit, listing, query) per TTL window
+    config = dict(st.secrets.get("listing_cache", {}))
+    return ListingCache(
+        ttl=config.get("ttl", 300),
+        stale_ttl=config.get("stale_ttl", 900),
+        max_entries=config.get("max_entries", 512),
+    )
+
+listing_cache = get_listing_cache()
+
+@st.cache_resource
+def get_comment_cache():
+    # Flattened comment trees keyed by post id, shared by every view and session
+    config = dict(st.secrets.get("comment_cache", {}))
+    return ListingCache(
+        ttl=config.get("ttl", 120),
+        stale_ttl=config.get("stale_ttl", 600),
+        max_entries=config.get("max_entries", 256),
+    )
+
+comment_cache = get_comment_cache()
+
 # --- Session State for Welcome Page ---
 if "has_entered" not in st.session_state:
     st.session_state.has_entered = False
@@ -325,14 +402,12 @@ if view_mode == "Live View":
     headline_options, post_dict = [], {}
 
     if topic:
-        for sub in curated_subreddits:
-            try:
-                for post in reddit.subreddit(sub).search(topic, sort="relevance", time_filter="week", limit=2):
-                    if not post.stickied:
-                        headline_options.append(post.title)
-                        post_dict[post.title] = post
-            except:
-                continue
+        search_posts, search_failures = search_subreddits(reddit_pool, curated_subreddits, topic, limit=2, cache=listing_cache, timeout=SEARCH_TIMEOUT, max_workers=SEARCH_WORKERS)
+        for post in search_posts:
+            headline_options.append(post.title)
+            post_dict[post.title] = post
+        if search_failures:
+            st.caption("Couldn't reach: " + ", ".join(f"r/{sub}" for sub in search_failures))
         page_size = 5
         total_pages = len(headline_options) // page_size + int(len(headline_options) % page_size > 0)
         page = st.number_input("Page", min_value=1, max_value=total_pages, step=1) if total_pages > 1 else 1
@@ -356,9 +431,7 @@ if view_mode == "Live View":
                 </div>
             </div>""", unsafe_allow_html=True)
 
-        submission = reddit.submission(id=post.id)
-        submission.comments.replace_more(limit=0)
-        comments = submission.comments[:30]
+        comments = top_level_comments(fetch_comment_tree(reddit, post.id, cache=comment_cache), 30)
 
         # --- Reflection form ---
         emotions = ["Angry", "Hopeful", "Skeptical", "Confused", "Inspired", "Indifferent"]
@@ -392,24 +465,21 @@ if view_mode == "Live View":
             st.session_state["user_thoughts"] = ""
 
     # --- NOW (still inside if selected_headline) ---
-    submission = reddit.submission(id=post.id)
-    submission.comments.replace_more(limit=0)
-    comments = submission.comments[:30]
+    comments = top_level_comments(fetch_comment_tree(reddit, post.id, cache=comment_cache), 30)
 
     # (then you go on with comments, reactions, public reflections, field...)
 
     emotion_counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
     emotion_groups = defaultdict(list)
 
-    for comment in comments:
-        text = comment.body.strip()
+    texts = [comment.body.strip() for comment in comments]
+    polarities, labels = get_backend(st.secrets.get("sentiment", {})).score(texts)
+    for comment, text, polarity, label in zip(comments, texts, polarities.tolist(), labels):
         if len(text) < 10:
             continue
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-        label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
         emotion_counts[label] += 1
         emotion_groups[label].append({
+            "id": comment_key(comment),
             "text": text,
             "score": round(polarity, 3),
             "author": str(comment.author),
@@ -469,7 +539,7 @@ else:
                     </div>
                     """, unsafe_allow_html=True)
 
-                    comment_id = str(hash(comment["text"]))[:8]  # unique per comment
+                    comment_id = comment["id"]  # Reddit fullname, stable across restarts
 
                     # 2. Reaction Radio Buttons
                     reaction = st.radio(
@@ -481,9 +551,11 @@ else:
                     if reaction.strip():
                         reaction_ws.append_row([
                             selected_headline,
-                            comment["text"][:100],
+                            comment["text"][:SNIPPET_LENGTH],
                             reaction,
-                            datetime.utcnow().isoformat()
+                            datetime.utcnow().isoformat(),
+                            post.id,
+                            comment_id
                         ])
                         auto_trim_worksheet(reaction_ws)
 
@@ -491,11 +563,16 @@ else:
                     with st.form(key=f"form_reflection_{comment_id}"):
                         user_reflection = st.text_input("Your reflection on this comment:")
                         if st.form_submit_button("Submit Reflection") and user_reflection.strip():
+                            # Same column layout as AGORA_TABS["CommentReflections"]; no field name here
                             comment_reflections_ws.append_row([
+                                "",
                                 selected_headline,
-                                comment["text"][:100],  # first 100 chars of the comment
+                                comment["text"][:SNIPPET_LENGTH],  # first 100 chars of the comment
                                 user_reflection.strip(),
-                                datetime.utcnow().isoformat()
+                                reaction,
+                                datetime.utcnow().isoformat(),
+                                post.id,
+                                comment_id
                             ])
                             auto_trim_worksheet(comment_reflections_ws)
                             st.success("Reflection added!")
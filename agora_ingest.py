@@ -0,0 +1,467 @@
+# --- Agora Ingestion Worker ---
+# Long-running worker that keeps the local store full of fresh Reddit data:
+# hot and new listings for every curated subreddit, plus the comment tree
+# (with sentiment already scored) of each listed post. The app reads from the
+# same SQLite file, so Live View renders without waiting on Reddit.
+#
+#   python agora_ingest.py              # poll forever, [ingest] interval apart
+#   python agora_ingest.py --once       # one cycle, then exit
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from agora_dedup import NearDuplicateIndex
+from agora_reddit import CommentRecord, PostRecord, fetch_listing, fetch_new_since, flatten_comment_tree
+from agora_sentiment import get_backend
+from agora_textfilter import FILTER_RULES, CommentFilter, filter_counts, normalize
+
+CURATED_SUBREDDITS = [
+    "news", "worldnews", "politics", "uspolitics",
+    "ukpolitics", "geopolitics", "europe", "MiddleEastNews",
+    "technology", "Futurology", "science", "environment",
+    "TrueOffMyChest", "ChangeMyView", "AskPolitics",
+    "Philosophy", "CasualConversation", "UpliftingNews"
+]
+
+
+def repost_key(post):
+    # Link posts repost the same URL; self posts (URL is their own permalink) repeat the title
+    url = (post.url or "").split("?")[0].rstrip("/").lower()
+    if url and "reddit.com/r/" not in url and not url.startswith("/r/"):
+        return url
+    return " ".join(post.title.lower().split())
+
+
+# --- Listing cursors ---
+class ListingCursor:
+    # Per-subreddit polling state: the newest fullname seen in /new (Reddit's
+    # "before" cursor), when the last full fetch happened, and a bounded
+    # post id -> repost key map used to drop re-ranked and reposted items.
+    def __init__(self, newest=None, full_at=None, seen=(), seen_size=500):
+        self.newest = newest
+        self.full_at = full_at
+        self.seen_size = seen_size
+        self.seen = OrderedDict(seen)
+
+    def is_seen(self, post):
+        return post.id in self.seen
+
+    def is_repost(self, post):
+        key = repost_key(post)
+        return any(k == key for pid, k in self.seen.items() if pid != post.id)
+
+    def mark(self, post):
+        self.seen[post.id] = repost_key(post)
+        self.seen.move_to_end(post.id)
+        while len(self.seen) > self.seen_size:
+            self.seen.popitem(last=False)
+
+
+# --- Store ---
+class IngestStore:
+    def __init__(self, path="agora.db"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ingested_posts (
+                subreddit TEXT NOT NULL,
+                listing TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                fullname TEXT, title TEXT, permalink TEXT, url TEXT,
+                score INTEGER, num_comments INTEGER, created_utc REAL, stickied INTEGER,
+                ingested_at REAL NOT NULL,
+                PRIMARY KEY (subreddit, listing, position)
+            );
+            CREATE TABLE IF NOT EXISTS ingested_comments (
+                post_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                fullname TEXT, body TEXT, score INTEGER, author TEXT,
+                created_utc REAL, parent_id TEXT, depth INTEGER,
+                polarity REAL, label TEXT,
+                PRIMARY KEY (post_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS ingested_trees (
+                post_id TEXT PRIMARY KEY,
+                ingested_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingest_cursors (
+                subreddit TEXT PRIMARY KEY,
+                newest TEXT,
+                full_at REAL,
+                seen TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingest_health (
+                worker TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL,
+                status TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def save_listing(self, subreddit, listing, posts):
+        # A listing is replaced as a whole so its order matches Reddit's
+        now = time.time()
+        rows = [
+            (subreddit, listing, i, p.id, p.fullname, p.title, p.permalink, p.url,
+             p.score, p.num_comments, p.created_utc, int(p.stickied), now)
+            for i, p in enumerate(posts)
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM ingested_posts WHERE subreddit = ? AND listing = ?", (subreddit, listing))
+                self.conn.executemany(
+                    "INSERT INTO ingested_posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def _listing_rows(self, subreddit, listing, limit):
+        with self.lock:
+            return self.conn.execute("""
+                SELECT id, fullname, title, subreddit, permalink, url, score, num_comments,
+                       created_utc, stickied, ingested_at
+                FROM ingested_posts WHERE subreddit = ? AND listing = ?
+                ORDER BY position LIMIT ?
+            """, (subreddit, listing, limit)).fetchall()
+
+    def stored_posts(self, subreddit, listing, limit=-1):
+        return [PostRecord(*row[:9], stickied=bool(row[9])) for row in self._listing_rows(subreddit, listing, limit)]
+
+    def recent_posts(self, subreddit, listing="hot", limit=15, max_age=900):
+        # PostRecords in listing order, or None if the worker hasn't refreshed them lately
+        rows = self._listing_rows(subreddit, listing, limit)
+        if not rows or time.time() - rows[0][-1] > max_age:
+            return None
+        return [PostRecord(*row[:9], stickied=bool(row[9])) for row in rows]
+
+    def load_cursor(self, subreddit):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT newest, full_at, seen FROM ingest_cursors WHERE subreddit = ?", (subreddit,)
+            ).fetchone()
+        if row is None:
+            return ListingCursor()
+        return ListingCursor(row[0], row[1], json.loads(row[2]))
+
+    def save_cursor(self, subreddit, cursor):
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingest_cursors (subreddit, newest, full_at, seen) VALUES (?, ?, ?, ?)",
+                    (subreddit, cursor.newest, cursor.full_at, json.dumps(list(cursor.seen.items()))),
+                )
+
+    def tree_ingested_at(self, post_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ingested_at FROM ingested_trees WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def tree_age(self, post_id):
+        ingested_at = self.tree_ingested_at(post_id)
+        return None if ingested_at is None else time.time() - ingested_at
+
+    def save_comments(self, post_id, records, scores):
+        rows = [
+            (post_id, i, r.id, r.fullname, r.body, r.score, r.author, r.created_utc,
+             r.parent_id, r.depth, *scores[i])
+            for i, r in enumerate(records)
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM ingested_comments WHERE post_id = ?", (post_id,))
+                self.conn.executemany(
+                    "INSERT INTO ingested_comments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingested_trees (post_id, ingested_at) VALUES (?, ?)",
+                    (post_id, time.time()),
+                )
+
+    def comment_tree(self, post_id, max_age=900):
+        # (CommentRecords, {comment id: polarity}), or None if missing or stale
+        age = self.tree_age(post_id)
+        if age is None or age > max_age:
+            return None
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT id, fullname, body, score, author, created_utc, parent_id, depth, polarity
+                FROM ingested_comments WHERE post_id = ? ORDER BY position
+            """, (post_id,)).fetchall()
+        records = [CommentRecord(*row[:8]) for row in rows]
+        polarity = {row[0]: row[8] for row in rows if row[8] is not None}
+        return records, polarity
+
+    def rescore_comments(self, scorer, batch_size=50000):
+        # Backfill: re-score every stored comment, one batch of rows at a time
+        last, total = 0, 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, body FROM ingested_comments WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return total
+            # Same clean-up as live ingestion; per-tree duplicate rules don't apply here
+            texts = [normalize(body) for _, body in rows]
+            polarities, labels = scorer(texts)
+            updates = [
+                (p, l, rowid) if text else (None, None, rowid)
+                for (rowid, _), text, p, l in zip(rows, texts, polarities.tolist(), labels)
+            ]
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany("UPDATE ingested_comments SET polarity = ?, label = ? WHERE rowid = ?", updates)
+            last = rows[-1][0]
+            total += len(rows)
+
+    def prune(self, keep_post_ids):
+        # Drop comment trees for posts that have fallen out of every listing
+        with self.lock:
+            with self.conn:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_posts (id TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM keep_posts")
+                self.conn.executemany("INSERT OR IGNORE INTO keep_posts VALUES (?)", [(i,) for i in keep_post_ids])
+                self.conn.execute("DELETE FROM ingested_comments WHERE post_id NOT IN (SELECT id FROM keep_posts)")
+                self.conn.execute("DELETE FROM ingested_trees WHERE post_id NOT IN (SELECT id FROM keep_posts)")
+
+    def write_health(self, worker, status):
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingest_health (worker, updated_at, status) VALUES (?, ?, ?)",
+                    (worker, time.time(), json.dumps(status)),
+                )
+
+    def health(self, worker="ingest"):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT updated_at, status FROM ingest_health WHERE worker = ?", (worker,)
+            ).fetchone()
+        if row is None:
+            return None
+        status = json.loads(row[1])
+        status["age"] = time.time() - row[0]
+        return status
+
+
+# --- Worker ---
+class Ingestor:
+    def __init__(self, reddit, store, subreddits, listings=("hot", "new"), limit=15,
+                 comment_posts=5, comment_refresh=600, min_remaining=20, backoff=60,
+                 full_refresh=1800, seen_size=500, index=None, dedup_threshold=0.5, sentiment=None,
+                 comment_filter=None, worker="ingest"):
+        self.reddit = reddit
+        self.store = store
+        self.subreddits = list(subreddits)
+        self.listings = list(listings)
+        self.limit = limit
+        self.comment_posts = comment_posts      # posts per listing whose comments are pulled
+        self.comment_refresh = comment_refresh  # seconds before a tree is fetched again
+        self.min_remaining = min_remaining
+        self.backoff = backoff
+        self.full_refresh = full_refresh  # a full /new fetch now and then recovers from a deleted cursor post
+        self.seen_size = seen_size
+        self.index = index  # optional SearchIndex fed with everything ingested
+        self.dedup_threshold = dedup_threshold
+        self.sentiment = sentiment  # optional SentimentCache; unchanged comments aren't re-scored
+        self.comment_filter = CommentFilter(**dict(comment_filter or {}))
+        self.worker = worker
+        self.status = {
+            "state": "starting", "started_at": time.time(), "cycles": 0,
+            "last_cycle_at": None, "last_cycle_seconds": None,
+            "posts": 0, "comment_trees": 0, "errors": 0, "last_error": "",
+            "rate_remaining": None, "rate_waits": 0,
+            "posts_new": 0, "duplicates_dropped": 0, "cursor_polls": 0, "full_polls": 0,
+            "duplicate_stories": 0, "comments_kept": 0,
+        }
+        self.status.update({f"filtered_{rule}": 0 for rule in FILTER_RULES})
+
+    def _respect_rate_limit(self):
+        # PRAW reports the quota left in the current window after each request
+        limits = getattr(self.reddit.auth, "limits", {}) or {}
+        remaining = limits.get("remaining")
+        self.status["rate_remaining"] = remaining
+        if remaining is None or remaining > self.min_remaining:
+            return
+        reset = limits.get("reset_timestamp")
+        wait = max(reset - time.time(), 1) if reset else self.backoff
+        self.status["rate_waits"] += 1
+        self._report("rate_limited")
+        time.sleep(wait)
+
+    def _report(self, state):
+        self.status["state"] = state
+        self.store.write_health(self.worker, self.status)
+
+    def _fail(self, where, e):
+        self.status["errors"] += 1
+        self.status["last_error"] = f"{where}: {type(e).__name__}: {e}"
+
+    def ingest_comments(self, post_id):
+        age = self.store.tree_age(post_id)
+        if age is not None and age < self.comment_refresh:
+            return False
+        self._respect_rate_limit()
+        records = flatten_comment_tree(self.reddit.submission(id=post_id))
+        # Low-signal comments are stored unscored; the rest are scored in one batch
+        counts = filter_counts()
+        kept = self.comment_filter.filter(records, counts)
+        ids = [r.id for r, _ in kept]
+        texts = [text for _, text in kept]
+        if self.sentiment is not None:
+            polarities, labels = self.sentiment.score(ids, texts)
+        else:
+            polarities, labels = get_backend().score(texts)
+        by_id = dict(zip(ids, zip(polarities.tolist(), labels)))
+        scores = [by_id.get(r.id, (None, None)) for r in records]
+        self.status["comments_kept"] += counts["kept"]
+        for rule in FILTER_RULES:
+            self.status[f"filtered_{rule}"] += counts[rule]
+        self.store.save_comments(post_id, records, scores)
+        if self.index is not None:
+            self.index.add_comments(post_id, records)
+        return True
+
+    def poll_listing(self, sub, listing, cursor):
+        # /new is fetched incrementally from the cursor and merged into the stored
+        # listing; ranked listings (hot, top) have no stable cursor and are fetched whole
+        if listing == "new":
+            if cursor.newest is None or cursor.full_at is None or time.time() - cursor.full_at >= self.full_refresh:
+                fresh = fetch_listing(self.reddit, sub, "new", limit=self.limit)
+                cursor.full_at = time.time()
+                self.status["full_polls"] += 1
+                posts = fresh
+            else:
+                fresh = fetch_new_since(self.reddit, sub, before=cursor.newest, limit=self.limit)
+                self.status["cursor_polls"] += 1
+                fresh_ids = {p.id for p in fresh}
+                posts = (fresh + [p for p in self.store.stored_posts(sub, "new") if p.id not in fresh_ids])[:self.limit]
+            if fresh:
+                cursor.newest = fresh[0].fullname
+        else:
+            posts = fetch_listing(self.reddit, sub, listing, limit=self.limit)
+
+        kept = []
+        for post in posts:
+            if cursor.is_repost(post):
+                self.status["duplicates_dropped"] += 1
+                continue
+            if not cursor.is_seen(post):
+                self.status["posts_new"] += 1
+            cursor.mark(post)
+            kept.append(post)
+        return kept
+
+    def run_once(self):
+        started = time.monotonic()
+        self._report("running")
+        keep = set()
+        # One story per cycle: a cross-post of a story already fetched doesn't get its own tree
+        stories = NearDuplicateIndex(threshold=self.dedup_threshold)
+        for sub in self.subreddits:
+            cursor = self.store.load_cursor(sub)
+            cursor.seen_size = self.seen_size
+            for listing in self.listings:
+                try:
+                    self._respect_rate_limit()
+                    posts = self.poll_listing(sub, listing, cursor)
+                    self.store.save_listing(sub, listing, posts)
+                    if self.index is not None:
+                        self.index.add_posts(posts)
+                    self.status["posts"] += len(posts)
+                except Exception as e:
+                    self._fail(f"r/{sub} {listing}", e)
+                    continue
+                keep.update(p.id for p in posts)
+                for post in [p for p in posts if not p.stickied][:self.comment_posts]:
+                    if stories.add(post) != post.id:
+                        self.status["duplicate_stories"] += 1
+                        continue
+                    try:
+                        if self.ingest_comments(post.id):
+                            self.status["comment_trees"] += 1
+                    except Exception as e:
+                        self._fail(f"comments {post.id}", e)
+            self.store.save_cursor(sub, cursor)
+        if keep:
+            self.store.prune(keep)
+        if self.index is not None:
+            self.index.prune()
+        self.status["cycles"] += 1
+        self.status["last_cycle_at"] = time.time()
+        self.status["last_cycle_seconds"] = round(time.monotonic() - started, 2)
+        self._report("idle")
+
+    def run_forever(self, interval=300):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                self._fail("cycle", e)
+                self._report("error")
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    from agora_config import SECRETS_PATH, load_secrets, make_reddit
+    from agora_search import SearchIndex
+    from agora_sentiment import SentimentCache, parallel_stats, score_parallel
+
+    parser = argparse.ArgumentParser(description="Pre-fetch Reddit listings and comments into the Agora store.")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--interval", type=float, help="seconds between cycles")
+    parser.add_argument("--rescore", action="store_true", help="re-score every stored comment across a process pool and exit")
+    parser.add_argument("--secrets", default=SECRETS_PATH)
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    config = dict(secrets.get("ingest", {}))
+    path = config.get("path", dict(secrets.get("storage", {})).get("path", "agora.db"))
+    sentiment_config = dict(secrets.get("sentiment", {}))
+
+    def scorer(texts):
+        # Big trees and backfills go to the process pool; typical threads stay inline
+        return score_parallel(
+            texts,
+            config=sentiment_config,
+            workers=sentiment_config.get("workers"),
+            chunk_size=sentiment_config.get("chunk_size", 2000),
+            inline_threshold=sentiment_config.get("inline_threshold", 5000),
+        )
+
+    if args.rescore:
+        rescored = IngestStore(path).rescore_comments(scorer)
+        # Stored scores now all come from the current backend; cached scores of other versions can go
+        pruned = SentimentCache(path, backend=get_backend(sentiment_config)).prune_versions()
+        print(json.dumps(dict(parallel_stats, rescored=rescored, pruned_cache_entries=pruned), indent=2))
+        raise SystemExit(0)
+
+    ingestor = Ingestor(
+        make_reddit(secrets),
+        IngestStore(path),
+        config.get("subreddits", CURATED_SUBREDDITS),
+        listings=config.get("listings", ["hot", "new"]),
+        limit=config.get("limit", 15),
+        comment_posts=config.get("comment_posts", 5),
+        comment_refresh=config.get("comment_refresh", 600),
+        min_remaining=config.get("min_remaining", 20),
+        full_refresh=config.get("full_refresh", 1800),
+        seen_size=config.get("seen_size", 500),
+        index=SearchIndex(path) if dict(secrets.get("search", {})).get("enabled", True) else None,
+        dedup_threshold=dict(secrets.get("dedup", {})).get("threshold", 0.5),
+        sentiment=SentimentCache(path, backend=get_backend(sentiment_config), scorer=scorer),
+        comment_filter=secrets.get("comment_filter", {}),
+    )
+    if args.once:
+        ingestor.run_once()
+        print(json.dumps(ingestor.status, indent=2))
+    else:
+        ingestor.run_forever(args.interval or config.get("interval", 300))
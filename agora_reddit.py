@@ -0,0 +1,303 @@
+# --- Agora Reddit Access ---
+# Shared helpers for pulling listings out of Reddit.
+
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+# Compact, picklable stand-in for a PRAW Submission; views only read these fields
+PostRecord = namedtuple(
+    "PostRecord",
+    "id fullname title subreddit permalink url score num_comments created_utc stickied",
+)
+
+
+# Flattened comment; parent_id is the parent's fullname (t3_ for top-level comments)
+CommentRecord = namedtuple(
+    "CommentRecord",
+    "id fullname body score author created_utc parent_id depth",
+)
+
+
+def to_post_record(post):
+    return PostRecord(
+        id=post.id,
+        fullname=f"t3_{post.id}",
+        title=post.title,
+        subreddit=str(post.subreddit),
+        permalink=post.permalink,
+        url=getattr(post, "url", ""),
+        score=getattr(post, "score", 0),
+        num_comments=getattr(post, "num_comments", 0),
+        created_utc=getattr(post, "created_utc", 0.0),
+        stickied=bool(getattr(post, "stickied", False)),
+    )
+
+
+# --- Shared listing cache ---
+class ListingCache:
+    # Process-wide TTL + LRU cache. Listings are keyed by
+    # (subreddit, listing, query, time_filter, limit); comment trees by ("comments", post id).
+    # Fresh entries are served directly; entries up to `stale_ttl` past expiry are
+    # served immediately while one background refresh runs; anything older is
+    # fetched inline. Concurrent misses on one key share a single fetch.
+    def __init__(self, ttl=300, stale_ttl=900, max_entries=512):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # key -> (fetched_at, value)
+        self.key_locks = {}
+        self.refreshing = set()
+        self.metrics = {"hits": 0, "stale_hits": 0, "misses": 0, "refresh_errors": 0, "evictions": 0}
+
+    def get(self, key, fetch):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.metrics["hits"] += 1
+                    return entry[1]
+                if age < self.ttl + self.stale_ttl:
+                    self.entries.move_to_end(key)
+                    self.metrics["stale_hits"] += 1
+                    if key not in self.refreshing:
+                        self.refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return entry[1]
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                    self.metrics["hits"] += 1
+                    return entry[1]
+                self.metrics["misses"] += 1
+            value = fetch()
+            self._store(key, value)
+            return value
+
+    def fetched_at(self, key):
+        # When the cached value was fetched (monotonic clock), or None; changes on every refresh
+        with self.lock:
+            entry = self.entries.get(key)
+        return None if entry is None else entry[0]
+
+    def stats(self):
+        with self.lock:
+            snapshot = dict(self.metrics)
+            snapshot["entries"] = len(self.entries)
+        return snapshot
+
+    def _store(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                old_key, _ = self.entries.popitem(last=False)
+                self.key_locks.pop(old_key, None)
+                self.metrics["evictions"] += 1
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception:
+            with self.lock:
+                self.metrics["refresh_errors"] += 1
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+
+def fetch_listing(reddit, sub, listing="hot", limit=15, cache=None):
+    # hot / new / top listing of one subreddit as PostRecords
+    def fetch():
+        return [to_post_record(p) for p in getattr(reddit.subreddit(sub), listing)(limit=limit)]
+    if cache is None:
+        return fetch()
+    return cache.get((sub, listing, None, None, limit), fetch)
+
+
+def fetch_new_since(reddit, sub, before=None, limit=15):
+    # Only posts newer than the `before` fullname; Reddit returns them newest
+    # first, so stop at the cursor in case a follow-up page wraps around to it
+    posts = []
+    for p in reddit.subreddit(sub).new(limit=limit, params={"before": before} if before else {}):
+        if f"t3_{p.id}" == before:
+            break
+        posts.append(to_post_record(p))
+    return posts
+
+
+# --- Comment trees ---
+def flatten_comment_tree(submission):
+    # One pass over the whole forest; comments.list() is breadth-first, so a
+    # parent is always seen before its replies.
+    submission.comments.replace_more(limit=0)
+    depths, records = {}, []
+    for c in submission.comments.list():
+        fullname = f"t1_{c.id}"
+        depth = 0 if c.parent_id.startswith("t3_") else depths.get(c.parent_id, 0) + 1
+        depths[fullname] = depth
+        records.append(CommentRecord(
+            id=c.id,
+            fullname=fullname,
+            body=c.body,
+            score=getattr(c, "score", 0),
+            author=str(c.author),
+            created_utc=c.created_utc,
+            parent_id=c.parent_id,
+            depth=depth,
+        ))
+    return records
+
+
+def fetch_comment_tree(reddit, post_id, cache=None):
+    # Shared by Live View, Ask Agora and snapshots: one Reddit fetch per post per TTL
+    def fetch():
+        return flatten_comment_tree(reddit.submission(id=post_id))
+    if cache is None:
+        return fetch()
+    return cache.get(("comments", post_id), fetch)
+
+
+def top_level_comments(records, limit=None):
+    # Same comments, in the same order, as submission.comments[:limit]
+    top = [r for r in records if r.depth == 0]
+    return top[:limit] if limit is not None else top
+
+
+# --- Topic search fan-out ---
+SEARCH_WORKERS = 8  # concurrent subreddit searches per process
+
+_search_executor = None
+_search_workers = 0
+_search_lock = threading.Lock()
+_pools = {}
+
+
+def get_search_executor(max_workers=SEARCH_WORKERS):
+    # One bounded thread pool for every topic search in the process, created on
+    # first use. Searches past max_workers queue; a timed-out search holds its
+    # thread only until its per-request timeout.
+    global _search_executor, _search_workers
+    with _search_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agora-search")
+            _search_workers = max_workers
+        return _search_executor, _search_workers
+
+
+class RedditPool:
+    # praw.Reddit is not thread-safe, so every concurrent search checks out an
+    # instance of its own. At most max_size instances exist; a checkout waits up
+    # to checkout_timeout seconds for one to come back. Idle instances (and their
+    # OAuth tokens) are kept for the next search; make_reddit should set a
+    # per-request timeout.
+    def __init__(self, make_reddit, max_size=SEARCH_WORKERS, checkout_timeout=30):
+        self.make_reddit = make_reddit
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+
+    @contextmanager
+    def reddit(self):
+        if not self.slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"no Reddit instance free after {self.checkout_timeout}s")
+        try:
+            try:
+                reddit = self.idle.get_nowait()
+            except queue.Empty:
+                reddit = self.make_reddit()
+                with self.lock:
+                    self.created += 1
+            try:
+                yield reddit
+            finally:
+                self.idle.put(reddit)
+        finally:
+            self.slots.release()
+
+
+def get_reddit_pool(credentials, praw_kwargs=dict, max_size=SEARCH_WORKERS):
+    # One RedditPool per process and Reddit app, kept across reruns and sessions;
+    # the first call's settings win. praw_kwargs() builds the extra praw.Reddit
+    # arguments of each new instance (a per-request timeout, its own cassette session).
+    key = (credentials["client_id"], credentials["user_agent"])
+    with _search_lock:
+        if key not in _pools:
+            import praw
+
+            client_id, client_secret, user_agent = (
+                credentials["client_id"], credentials["client_secret"], credentials["user_agent"]
+            )
+            _pools[key] = RedditPool(lambda: praw.Reddit(
+                client_id=client_id,
+                client_secret=client_secret,
+                user_agent=user_agent,
+                **praw_kwargs()
+            ), max_size=max_size)
+        return _pools[key]
+
+
+def _search_one(pool, sub, topic, sort, time_filter, limit, cache):
+    # Materialize inside the worker so the HTTP call happens off the main thread
+    def fetch():
+        with pool.reddit() as reddit:
+            return [
+                to_post_record(p)
+                for p in reddit.subreddit(sub).search(topic, sort=sort, time_filter=time_filter, limit=limit)
+            ]
+    if cache is None:
+        return fetch()
+    return cache.get((sub, f"search:{sort}", topic.strip().lower(), time_filter, limit), fetch)
+
+
+def search_subreddits(pool, subreddits, topic, limit=3, time_filter="week", sort="relevance",
+                      timeout=10, cache=None, max_workers=SEARCH_WORKERS):
+    # Search the subreddits on the shared search executor, one RedditPool
+    # instance per search, and merge the results in subreddit order, dropping
+    # stickied and repeated posts. Returns (posts, failures): PostRecords, and
+    # subreddit -> error message. Searches run in waves of max_workers, so the
+    # deadline is one timeout per wave; searches that haven't started by then
+    # are cancelled. With a ListingCache, cached subreddits cost no Reddit call at all.
+    results, failures = {}, {}
+    if not subreddits:
+        return [], failures
+    executor, workers = get_search_executor(max_workers)
+    deadline = timeout * -(-len(subreddits) // workers)
+    futures = {
+        executor.submit(_search_one, pool, sub, topic, sort, time_filter, limit, cache): sub
+        for sub in subreddits
+    }
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            sub = futures[future]
+            try:
+                results[sub] = future.result()
+            except Exception as e:
+                failures[sub] = f"{type(e).__name__}: {e}"
+    except FuturesTimeout:
+        # Stragglers already running finish in the background and are discarded
+        for future, sub in futures.items():
+            if not future.done():
+                future.cancel()
+                failures[sub] = f"timed out after {deadline}s"
+
+    posts, seen = [], set()
+    for sub in subreddits:
+        for post in results.get(sub, []):
+            if post.stickied or post.id in seen:
+                continue
+            seen.add(post.id)
+            posts.append(post)
+    return posts, failures
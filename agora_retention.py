@@ -0,0 +1,138 @@
+# --- Agora Retention ---
+# Keeps each tab at roughly max_rows without touching the whole sheet on every
+# write. Appends only bump an in-memory row counter; a background pass trims
+# in bulk (on a schedule, or sooner if a tab overshoots by more than `slack`)
+# by reading just the rows being evicted, archiving them to a gzip partition
+# on disk and deleting them with a single delete_rows call.
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+
+def column_letter(n):
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def count_rows(ws):
+    # Data rows only (header excluded); column A is enough to count them
+    if hasattr(ws, "count_rows"):
+        return ws.count_rows()
+    return max(len(ws.col_values(1)) - 1, 0)
+
+
+class RetentionManager:
+    def __init__(self, archive_dir="archive", max_rows=1000, slack=200, interval=300, check_every=30):
+        self.archive_dir = archive_dir
+        self.max_rows = max_rows
+        self.slack = slack
+        self.interval = interval
+        self.check_every = check_every
+        self.lock = threading.Lock()
+        self.tracked = {}    # (kind, title) -> {"ws", "max_rows", "count", "appended", "last_trim"}
+        self.listeners = []  # called with (ws, evicted_count) after every trim
+        self.metrics = {"trims": 0, "rows_archived": 0, "trim_errors": 0, "last_error": ""}
+        self.thread = threading.Thread(target=self._run, name="agora-retention", daemon=True)
+        self.thread.start()
+
+    # --- Public API ---
+    def note_append(self, ws, rows=1, max_rows=None):
+        targets = [ws]
+        if getattr(ws, "mirror", None) is not None:
+            targets.append(ws.mirror)
+        with self.lock:
+            for target in targets:
+                key = (type(target).__name__, target.title)
+                entry = self.tracked.setdefault(key, {
+                    "count": None, "appended": 0, "last_trim": time.monotonic(),
+                })
+                entry["ws"] = target
+                entry["max_rows"] = max_rows or self.max_rows
+                entry["appended"] += rows
+
+    def on_trim(self, callback):
+        self.listeners.append(callback)
+
+    def run_due(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            entries = list(self.tracked.values())
+        for entry in entries:
+            try:
+                self._check(entry, now, force)
+            except Exception as e:
+                self.metrics["trim_errors"] += 1
+                self.metrics["last_error"] = f"{entry['ws'].title}: {e}"
+
+    def stats(self):
+        snapshot = dict(self.metrics)
+        with self.lock:
+            snapshot["row_counts"] = {
+                f"{kind}:{title}": entry["count"] for (kind, title), entry in self.tracked.items()
+            }
+        return snapshot
+
+    # --- Internals ---
+    def _check(self, entry, now, force):
+        ws = entry["ws"]
+        with self.lock:
+            appended, entry["appended"] = entry["appended"], 0
+        if entry["count"] is None:
+            if hasattr(ws, "flush"):
+                ws.flush()
+            entry["count"] = count_rows(ws)
+        else:
+            entry["count"] += appended
+        excess = entry["count"] - entry["max_rows"]
+        if excess <= 0:
+            return
+        if not (force or excess > self.slack or now - entry["last_trim"] >= self.interval):
+            return
+        if hasattr(ws, "flush"):
+            ws.flush()  # queued rows must be on the sheet before positions are used
+        self._trim(ws, excess)
+        entry["count"] -= excess
+        entry["last_trim"] = now
+
+    def _headers(self, ws):
+        headers = getattr(ws, "headers", None)
+        return list(headers) if headers else ws.row_values(1)
+
+    def _trim(self, ws, excess):
+        headers = self._headers(ws)
+        last_col = column_letter(max(len(headers), 1))
+        # Row 1 is the header; rows 2..excess+1 are the oldest data rows
+        evicted = ws.get(f"A2:{last_col}{excess + 1}")
+        self._archive(ws.title, headers, evicted)
+        ws.delete_rows(2, excess + 1)
+        self.metrics["trims"] += 1
+        self.metrics["rows_archived"] += len(evicted)
+        for callback in self.listeners:
+            callback(ws, excess)
+
+    def _archive(self, title, headers, rows):
+        if not rows:
+            return
+        folder = os.path.join(self.archive_dir, re.sub(r"[^\w.-]", "_", title))
+        os.makedirs(folder, exist_ok=True)
+        archived_at = datetime.utcnow()
+        path = os.path.join(folder, f"{archived_at.strftime('%Y-%m-%d')}.jsonl.gz")
+        # gzip supports appending members, so one partition per day keeps growing safely
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in rows:
+                record = dict(zip(headers, list(row) + [""] * (len(headers) - len(row))))
+                record["_archived_at"] = archived_at.isoformat()
+                f.write(json.dumps(record) + "\n")
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_every)
+            self.run_due()
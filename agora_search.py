@@ -0,0 +1,141 @@
+# --- Agora Local Search ---
+# SQLite FTS5 index over every headline and comment the app or the ingestion
+# worker has fetched. Topic searches rank posts by BM25 (a post matches on
+# its own title, or more weakly through its comments) times a recency decay,
+# and are answered locally instead of fanning out to Reddit.
+
+import math
+import re
+import sqlite3
+import threading
+import time
+
+from agora_reddit import PostRecord
+
+
+def match_query(topic, any_term=False):
+    # Quote every term so user input can't inject FTS5 syntax; the last term is a prefix
+    terms = re.findall(r"\w+", topic.lower())
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*']
+    return (" OR " if any_term else " ").join(quoted)
+
+
+class SearchIndex:
+    def __init__(self, path="agora.db", half_life_hours=48, comment_weight=0.5):
+        self.half_life = half_life_hours * 3600
+        self.comment_weight = comment_weight
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS search_docs (
+                rowid INTEGER PRIMARY KEY,
+                doc_id TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                subreddit TEXT, title TEXT, body TEXT, permalink TEXT, url TEXT,
+                score INTEGER, num_comments INTEGER, created_utc REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_search_docs_post ON search_docs (post_id);
+            CREATE INDEX IF NOT EXISTS idx_search_docs_created ON search_docs (created_utc);
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                title, body, content='search_docs', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+                INSERT INTO search_fts (rowid, title, body) VALUES (new.rowid, new.title, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+                INSERT INTO search_fts (search_fts, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE ON search_docs BEGIN
+                INSERT INTO search_fts (search_fts, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+                INSERT INTO search_fts (rowid, title, body) VALUES (new.rowid, new.title, new.body);
+            END;
+        """)
+        self.conn.commit()
+        self.metrics = {"queries": 0, "avg_query_ms": 0.0, "indexed": 0}
+
+    # --- Writes ---
+    def _upsert(self, rows):
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT INTO search_docs (doc_id, kind, post_id, subreddit, title, body,
+                                             permalink, url, score, num_comments, created_utc)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (doc_id) DO UPDATE SET
+                        title = excluded.title, body = excluded.body,
+                        score = excluded.score, num_comments = excluded.num_comments
+                    WHERE title IS NOT excluded.title OR body IS NOT excluded.body
+                       OR score IS NOT excluded.score OR num_comments IS NOT excluded.num_comments
+                """, rows)
+            self.metrics["indexed"] += len(rows)
+
+    def add_posts(self, posts):
+        self._upsert([
+            (p.fullname, "post", p.id, p.subreddit, p.title, "", p.permalink, p.url,
+             p.score, p.num_comments, p.created_utc)
+            for p in posts
+        ])
+
+    def add_comments(self, post_id, records):
+        self._upsert([
+            (r.fullname, "comment", post_id, None, None, r.body, None, None, r.score, None, r.created_utc)
+            for r in records if r.body
+        ])
+
+    def prune(self, max_age_days=14):
+        cutoff = time.time() - max_age_days * 86400
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM search_docs WHERE created_utc < ?", (cutoff,))
+
+    # --- Queries ---
+    def _matches(self, query, limit):
+        with self.lock:
+            return self.conn.execute("""
+                SELECT d.kind, d.post_id, bm25(search_fts, 2.0, 1.0), d.created_utc
+                FROM search_fts JOIN search_docs d ON d.rowid = search_fts.rowid
+                WHERE search_fts MATCH ? ORDER BY bm25(search_fts, 2.0, 1.0) LIMIT ?
+            """, (query, limit)).fetchall()
+
+    def search(self, topic, limit=15, candidates=300):
+        # PostRecords ranked by relevance x recency; all terms must match, or any if none do
+        started = time.perf_counter()
+        query = match_query(topic)
+        if query is None:
+            return []
+        matches = self._matches(query, candidates) or self._matches(match_query(topic, any_term=True), candidates)
+        now = time.time()
+        scores = {}
+        for kind, post_id, rank, created in matches:
+            # bm25() is lower-is-better; flip it and decay by age
+            relevance = -rank * (1.0 if kind == "post" else self.comment_weight)
+            age = max(now - (created or now), 0)
+            weighted = relevance * math.exp(-math.log(2) * age / self.half_life)
+            scores[post_id] = scores.get(post_id, 0.0) + weighted
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        posts = self._posts(ranked)[:limit]
+        elapsed = (time.perf_counter() - started) * 1000
+        self.metrics["queries"] += 1
+        self.metrics["avg_query_ms"] += (elapsed - self.metrics["avg_query_ms"]) / self.metrics["queries"]
+        return posts
+
+    def _posts(self, post_ids):
+        if not post_ids:
+            return []
+        with self.lock:
+            rows = self.conn.execute(f"""
+                SELECT post_id, doc_id, title, subreddit, permalink, url, score, num_comments, created_utc
+                FROM search_docs WHERE kind = 'post' AND post_id IN ({", ".join("?" for _ in post_ids)})
+            """, post_ids).fetchall()
+        by_id = {row[0]: PostRecord(*row, stickied=False) for row in rows}
+        # Comments whose post was never indexed can't be shown as a headline
+        return [by_id[i] for i in post_ids if i in by_id]
+
+    def stats(self):
+        with self.lock:
+            docs = self.conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+        return dict(self.metrics, docs=docs)
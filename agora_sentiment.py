@@ -0,0 +1,582 @@
+# --- Agora Sentiment ---
+# Batch polarity scoring. TextBlob's pattern lexicon is compiled once into
+# NumPy arrays; a batch of comments is tokenized into one flat token array
+# and every rule (modifiers such as "very", negations, "!") is applied as an
+# array operation, so a whole thread is scored with a few vector ops instead
+# of one TextBlob object per comment. Scores follow TextBlob's rules closely
+# but not exactly; `python agora_sentiment.py` reports the agreement.
+#
+#   python agora_sentiment.py [--texts comments.jsonl] [--n 5000]   # default: the labeled fixture
+#   python agora_sentiment.py --n 200000 --workers 1,2,4   # process pool throughput
+#   python agora_sentiment.py --backends lexicon,textblob,vader --min-accuracy 0.7
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+# Bump whenever lexicon scoring changes; cached scores from other versions are ignored
+MODEL_VERSION = "lexicon-2"
+
+# Default label thresholds; [sentiment] positive_threshold / negative_threshold override them
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+LABELS = np.array(["Negative", "Neutral", "Positive"], dtype=object)
+NEGATIONS = ("no", "not", "n't", "never")
+
+TOKEN_RE = re.compile(r"n't|[a-z][a-z'-]*|!")
+
+
+def label_polarities(polarities, positive=POSITIVE_THRESHOLD, negative=NEGATIVE_THRESHOLD):
+    polarities = np.asarray(polarities, dtype=float)
+    return LABELS[(polarities > positive).astype(int) - (polarities < negative) + 1]
+
+
+def label_for(polarity, positive=POSITIVE_THRESHOLD, negative=NEGATIVE_THRESHOLD):
+    return "Positive" if polarity > positive else "Negative" if polarity < negative else "Neutral"
+
+
+def tokenize(text):
+    # Split "don't" into "do" + "n't" the way TextBlob's tokenizer does
+    return TOKEN_RE.findall(text.lower().replace("n't", " n't"))
+
+
+class Lexicon:
+    # word -> row in the polarity / intensity / modifier arrays
+    def __init__(self, vocab, polarity, intensity, modifier, negation):
+        self.vocab = vocab
+        self.polarity = polarity
+        self.intensity = intensity
+        self.modifier = modifier
+        self.negation = negation
+
+    @classmethod
+    def from_textblob(cls):
+        from textblob.en import sentiment as pattern_sentiment
+        pattern_sentiment.load()
+        words = list(dict.keys(pattern_sentiment))
+        vocab = {w: i for i, w in enumerate(words)}
+        for w in NEGATIONS:
+            vocab.setdefault(w, len(vocab))
+        n = len(vocab)
+        polarity = np.zeros(n)
+        intensity = np.ones(n)
+        modifier = np.zeros(n, dtype=bool)
+        known = np.zeros(n, dtype=bool)
+        for w, i in vocab.items():
+            senses = dict.get(pattern_sentiment, w)
+            if not senses:
+                continue
+            known[i] = True
+            polarity[i], _, intensity[i] = senses[None]
+            modifier[i] = "RB" in senses
+        negation = np.zeros(n, dtype=bool)
+        negation[[vocab[w] for w in NEGATIONS]] = True
+        # Unknown-but-listed words (the negations) are marked with NaN polarity
+        polarity[~known] = np.nan
+        return cls(vocab, polarity, intensity, modifier, negation)
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon():
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = Lexicon.from_textblob()
+    return _lexicon
+
+
+def score_texts(texts, lexicon=None):
+    # (polarities, labels) for a list of texts, as NumPy arrays
+    lex = lexicon or get_lexicon()
+    n_docs = len(texts)
+    if n_docs == 0:
+        return np.zeros(0), LABELS[:0]
+    token_lists = [tokenize(t or "") for t in texts]
+    lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64, count=n_docs)
+    tokens = [tok for toks in token_lists for tok in toks]
+    if not tokens:
+        polarities = np.zeros(n_docs)
+        return polarities, label_polarities(polarities)
+    doc = np.repeat(np.arange(n_docs), lengths)
+    idx = np.fromiter(map(lex.vocab.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+
+    in_lex = idx >= 0
+    safe = np.where(in_lex, idx, 0)
+    polarity = np.where(in_lex, lex.polarity[safe], np.nan)
+    known = ~np.isnan(polarity)
+    polarity = np.nan_to_num(polarity)
+    is_mod = known & lex.modifier[safe]
+    is_neg = in_lex & lex.negation[safe]
+    is_bang = np.fromiter((t == "!" for t in tokens), dtype=bool, count=len(tokens))
+
+    positions = np.arange(len(tokens))
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    length = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=len(tokens))
+    stripped = np.fromiter((len(t.strip("'")) for t in tokens), dtype=np.int64, count=len(tokens))
+
+    def last_before(mask):
+        # Position of the nearest earlier token in the same document where mask holds, else -1
+        last = np.full(len(tokens), -1)
+        last[1:] = np.maximum.accumulate(np.where(mask, positions, -1))[:-1]
+        return np.where(last >= starts, last, -1)
+
+    # "very good" / "really is a good": a modifier reaches the next known word across
+    # unknown words of up to two letters, and is absorbed into it
+    source = last_before(known)
+    mod_break = last_before(~known & ~is_neg & (length > 2))
+    modified = known & (source >= 0) & is_mod[np.maximum(source, 0)] & (mod_break < source)
+    targets, sources = positions[modified], source[modified]
+    absorbed = np.zeros(len(tokens), dtype=bool)
+    absorbed[sources] = True
+    # "not good" / "not a good" / "not exactly a great": a negation reaches the next
+    # known word across unknown words of at most one letter
+    neg_set = last_before(is_neg)
+    neg_reset = last_before(known | (~known & ~is_neg & (stripped > 1)))
+    head_negated = known & (neg_set >= 0) & (neg_set >= neg_reset)
+    # ... and a negated modifier passes it on to the word it modifies ("not a very good idea")
+    negated = head_negated.copy()
+    carry = head_negated & absorbed
+    while carry.any():
+        reached = np.zeros(len(tokens), dtype=bool)
+        reached[targets] = carry[sources]
+        reached &= ~negated
+        negated |= reached
+        carry = reached & absorbed
+    # The modifier scales the word it modifies; a negated modifier scales it down instead
+    scale = np.ones(len(tokens))
+    scale[targets] = np.where(head_negated[sources], 1.0 / lex.intensity[safe[sources]], lex.intensity[safe[sources]])
+    polarity = np.clip(polarity * scale, -1.0, 1.0)
+    counted = known & ~absorbed
+    # "good!" / "good at all!": the last assessed word before a "!" is boosted
+    last_counted = np.maximum.accumulate(np.where(counted, positions, -1))
+    bangs = positions[is_bang & (positions > 0)]
+    targets = last_counted[bangs - 1]
+    targets = targets[(targets >= 0) & (doc[np.maximum(targets, 0)] == doc[bangs])]
+    boosts = np.bincount(targets, minlength=len(tokens))
+    polarity = np.clip(polarity * 1.25 ** boosts, -1.0, 1.0)
+    # Negated assessments count as slightly the opposite
+    polarity = np.where(negated, polarity * -0.5, polarity)
+
+    totals = np.bincount(doc[counted], weights=polarity[counted], minlength=n_docs)
+    counts = np.bincount(doc[counted], minlength=n_docs)
+    polarities = np.divide(totals, counts, out=np.zeros(n_docs), where=counts > 0)
+    return polarities, label_polarities(polarities)
+
+
+# --- Backends ---
+# Every backend maps a batch of texts to polarities in [-1, 1]; labelling
+# happens here, with one pair of thresholds per backend. Pick one with
+# [sentiment] backend = "lexicon" | "textblob" | "vader" | "onnx".
+class SentimentBackend:
+    name = ""
+    version = ""
+    positive_threshold = POSITIVE_THRESHOLD
+    negative_threshold = NEGATIVE_THRESHOLD
+
+    def polarities(self, texts):
+        raise NotImplementedError
+
+    def label_for(self, polarity):
+        return label_for(polarity, self.positive_threshold, self.negative_threshold)
+
+    def label(self, polarities):
+        return label_polarities(polarities, self.positive_threshold, self.negative_threshold)
+
+    def score(self, texts):
+        polarities = self.polarities(texts)
+        return polarities, self.label(polarities)
+
+
+class LexiconBackend(SentimentBackend):
+    # The vectorized TextBlob-lexicon scorer above
+    name = "lexicon"
+    version = MODEL_VERSION
+
+    def polarities(self, texts):
+        return score_texts(texts)[0]
+
+
+class TextBlobBackend(SentimentBackend):
+    # Reference implementation: one TextBlob per comment
+    name = "textblob"
+
+    def __init__(self):
+        from importlib.metadata import version
+        from textblob import TextBlob
+        self.blob = TextBlob
+        self.version = f"textblob-{version('textblob')}"
+
+    def polarities(self, texts):
+        return np.array([self.blob(t).sentiment.polarity for t in texts], dtype=float)
+
+
+class VaderBackend(SentimentBackend):
+    # Rule-based VADER compound score (pip install vaderSentiment); VADER's own ±0.05 cut-offs
+    name = "vader"
+    version = "vader-3"
+    positive_threshold = 0.05
+    negative_threshold = -0.05
+
+    def __init__(self):
+        try:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        except ImportError as e:
+            raise ImportError("the vader sentiment backend needs `pip install vaderSentiment`") from e
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def polarities(self, texts):
+        return np.array([self.analyzer.polarity_scores(t)["compound"] for t in texts], dtype=float)
+
+
+class OnnxBackend(SentimentBackend):
+    # A (quantized) transformer classifier exported to ONNX, run on CPU with
+    # onnxruntime and a Hugging Face tokenizer.json. Polarity is
+    # P(positive) - P(negative) over the model's softmax.
+    name = "onnx"
+
+    def __init__(self, model_path, tokenizer_path, labels=("negative", "neutral", "positive"),
+                 max_length=128, batch_size=32, threads=None):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("the onnx sentiment backend needs `pip install onnxruntime tokenizers`") from e
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.negative = list(labels).index("negative")
+        self.positive = list(labels).index("positive")
+        self.batch_size = batch_size
+        self.version = f"onnx-{os.path.basename(model_path)}-{os.path.getsize(model_path)}"
+
+    def polarities(self, texts):
+        out = np.zeros(len(texts))
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch([t or "" for t in texts[start:start + self.batch_size]])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            out[start:start + len(encodings)] = probs[:, self.positive] - probs[:, self.negative]
+        return out
+
+
+def make_backend(config):
+    name = config.get("backend", "lexicon")
+    if name == "lexicon":
+        backend = LexiconBackend()
+    elif name == "textblob":
+        backend = TextBlobBackend()
+    elif name == "vader":
+        backend = VaderBackend()
+    elif name == "onnx":
+        backend = OnnxBackend(
+            config["onnx_model"],
+            config["onnx_tokenizer"],
+            labels=config.get("onnx_labels", ("negative", "neutral", "positive")),
+            max_length=config.get("onnx_max_length", 128),
+            threads=config.get("onnx_threads"),
+        )
+    else:
+        raise ValueError(f"unknown sentiment backend: {name}")
+    if "positive_threshold" in config:
+        backend.positive_threshold = config["positive_threshold"]
+    if "negative_threshold" in config:
+        backend.negative_threshold = config["negative_threshold"]
+    return backend
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(config=None):
+    # One instance per distinct config per process (models load once)
+    config = dict(config or {})
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = make_backend(config)
+        return _backends[key]
+
+
+# --- Parallel scoring ---
+# Whole threads and backfills are split into chunks and scored across a
+# process pool; each worker loads the backend once. Small inputs are
+# scored inline, where pool start-up and pickling would cost more than they save.
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+parallel_stats = {"calls": 0, "inline_calls": 0, "comments": 0, "seconds": 0.0,
+                  "last_per_sec": 0.0, "workers": 0, "chunks": 0}
+
+
+def _score_chunk(config, texts):
+    return get_backend(config).polarities(texts)
+
+
+def get_pool(workers=None):
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: safe to start from a process that already runs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+    return _pool
+
+
+def score_parallel(texts, config=None, workers=None, chunk_size=2000, inline_threshold=5000):
+    # Same result as get_backend(config).score(texts)
+    config = dict(config or {})
+    backend = get_backend(config)
+    started = time.perf_counter()
+    if len(texts) < inline_threshold:
+        polarities = backend.polarities(texts)
+        parallel_stats["inline_calls"] += 1
+    else:
+        pool = get_pool(workers)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        polarities = np.concatenate(list(pool.map(_score_chunk, repeat(config), chunks)))
+        parallel_stats["chunks"] += len(chunks)
+        parallel_stats["workers"] = _pool_workers
+    elapsed = time.perf_counter() - started
+    parallel_stats["calls"] += 1
+    parallel_stats["comments"] += len(texts)
+    parallel_stats["seconds"] += elapsed
+    parallel_stats["last_per_sec"] = round(len(texts) / elapsed) if elapsed > 0 else 0.0
+    return polarities, backend.label(polarities)
+
+
+# --- Memoized scoring ---
+def body_hash(text):
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=12).hexdigest()
+
+
+class SentimentCache:
+    # (comment id, body hash, model version) -> polarity. An in-memory LRU in
+    # front of an SQLite table, so a comment already scored by any session,
+    # view or the ingestion worker costs a dict lookup. An edited comment
+    # hashes differently, and switching backend (or its version) misses every old entry.
+    def __init__(self, path="agora.db", max_entries=50000, backend=None, scorer=None):
+        self.backend = backend or get_backend()
+        self.model_version = model_version = self.backend.version
+        self.max_entries = max_entries
+        self.scorer = scorer or self.backend.score
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                comment_id TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                polarity REAL NOT NULL,
+                PRIMARY KEY (comment_id, body_hash, model_version)
+            )
+        """)
+        # Other model versions are left alone: the app and the ingestion worker
+        # share this table and may run different backends. prune_versions() clears them.
+        self.conn.commit()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _remember(self, key, polarity):
+        self.memory[key] = polarity
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def score(self, comment_ids, texts):
+        # (polarities, labels) like backend.score; only unseen comments are scored
+        keys = [(cid, body_hash(t)) for cid, t in zip(comment_ids, texts)]
+        polarities = np.zeros(len(keys))
+        missing = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    polarities[i] = self.memory[key]
+                    self.metrics["memory_hits"] += 1
+                else:
+                    missing.append(i)
+            if missing:
+                found = {}
+                wanted = [keys[i] for i in missing]
+                for start in range(0, len(wanted), 400):
+                    chunk = wanted[start:start + 400]
+                    clause = " OR ".join("(comment_id = ? AND body_hash = ?)" for _ in chunk)
+                    rows = self.conn.execute(
+                        f"SELECT comment_id, body_hash, polarity FROM sentiment_cache "
+                        f"WHERE model_version = ? AND ({clause})",
+                        [self.model_version] + [part for key in chunk for part in key],
+                    ).fetchall()
+                    found.update({(cid, h): p for cid, h, p in rows})
+                still_missing = []
+                for i in missing:
+                    if keys[i] in found:
+                        polarities[i] = found[keys[i]]
+                        self._remember(keys[i], polarities[i])
+                        self.metrics["disk_hits"] += 1
+                    else:
+                        still_missing.append(i)
+                missing = still_missing
+        if missing:
+            scored = self.scorer([texts[i] for i in missing])[0]
+            polarities[missing] = scored
+            rows = [(keys[i][0], keys[i][1], self.model_version, float(p)) for i, p in zip(missing, scored)]
+            with self.lock:
+                self.metrics["misses"] += len(missing)
+                for i, p in zip(missing, scored):
+                    self._remember(keys[i], float(p))
+                with self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO sentiment_cache VALUES (?, ?, ?, ?)", rows)
+        return polarities, self.backend.label(polarities)
+
+    def prune_versions(self):
+        # Drop scores from every other model version; run explicitly (agora_ingest.py --rescore)
+        with self.lock:
+            with self.conn:
+                return self.conn.execute(
+                    "DELETE FROM sentiment_cache WHERE model_version != ?", (self.model_version,)
+                ).rowcount
+
+    def stats(self):
+        with self.lock:
+            return dict(self.metrics, entries=len(self.memory), model_version=self.model_version)
+
+
+# --- Benchmark ---
+FIXTURE_PATH = os.path.join("fixtures", "sentiment_labeled.jsonl")
+
+
+def load_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_texts(path):
+    return [record["text"] for record in load_records(path)]
+
+
+def benchmark_backends(records, names, batch_size=30, rounds=20, min_accuracy=0.0):
+    # Per backend: comments/sec, p50/p99 latency of one thread-sized batch, and
+    # agreement with the fixture's human labels. Recommends the fastest backend
+    # at or above min_accuracy.
+    texts = [r["text"] for r in records]
+    gold = np.array([r["label"] for r in records], dtype=object)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = {}
+    for name in names:
+        try:
+            backend = get_backend({"backend": name})
+            backend.score(texts[:1])  # load models outside the timing
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        latencies = []
+        for _ in range(rounds):
+            for batch in batches:
+                latencies.append(_timed(lambda: backend.score(batch)))
+        labels = backend.score(texts)[1]
+        results[name] = {
+            "version": backend.version,
+            "comments_per_sec": round(len(texts) * rounds / sum(latencies)),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+            "accuracy": round(float(np.mean(labels == gold)), 4),
+        }
+    passing = [n for n, r in results.items() if "error" not in r and r["accuracy"] >= min_accuracy]
+    return {
+        "comments": len(texts),
+        "batch_size": batch_size,
+        "backends": results,
+        "recommended": max(passing, key=lambda n: results[n]["comments_per_sec"]) if passing else None,
+    }
+
+
+def benchmark_workers(texts, worker_counts, chunk_size=2000):
+    # Comments per second for each pool size, to size workers per core
+    results = {"inline": round(len(texts) / _timed(lambda: score_texts(texts)))}
+    # Pool sizes are compared on the lexicon backend
+    for workers in worker_counts:
+        list(get_pool(workers).map(_score_chunk, repeat({}), [[""]] * workers))  # start every worker outside the timing
+        seconds = _timed(lambda: score_parallel(texts, workers=workers, chunk_size=chunk_size, inline_threshold=0))
+        results[f"{workers}_workers"] = round(len(texts) / seconds)
+    return results
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def benchmark(texts):
+    from textblob import TextBlob
+    started = time.perf_counter()
+    reference = np.array([TextBlob(t).sentiment.polarity for t in texts])
+    textblob_seconds = time.perf_counter() - started
+    get_lexicon()  # compile outside the timed section
+    started = time.perf_counter()
+    polarities, labels = score_texts(texts)
+    batch_seconds = time.perf_counter() - started
+    return {
+        "comments": len(texts),
+        "textblob_per_sec": round(len(texts) / textblob_seconds),
+        "batch_per_sec": round(len(texts) / batch_seconds),
+        "speedup": round(textblob_seconds / batch_seconds, 1),
+        "label_agreement": round(float(np.mean(labels == label_polarities(reference))), 4),
+        "mean_abs_error": round(float(np.mean(np.abs(polarities - reference))), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare batch sentiment scoring against TextBlob.")
+    parser.add_argument("--texts", help="JSONL file with a 'text' field per line")
+    parser.add_argument("--n", type=int, default=5000, help="number of comments when cycling through the fixture")
+    parser.add_argument("--workers", help="comma-separated process pool sizes to benchmark, e.g. 1,2,4")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--backends", help="comma-separated backends to compare on the labeled fixture, e.g. lexicon,textblob,vader")
+    parser.add_argument("--fixture", default=FIXTURE_PATH, help="labeled JSONL ('text', 'label'); the default benchmark texts")
+    parser.add_argument("--min-accuracy", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.backends:
+        report = benchmark_backends(load_records(args.fixture), args.backends.split(","), min_accuracy=args.min_accuracy)
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0)
+    if args.texts:
+        texts = load_texts(args.texts)
+    else:
+        fixture = load_texts(args.fixture)
+        texts = [fixture[i % len(fixture)] for i in range(args.n)]
+    if args.workers:
+        print(json.dumps(benchmark_workers(texts, [int(w) for w in args.workers.split(",")], args.chunk_size), indent=2))
+    else:
+        print(json.dumps(benchmark(texts), indent=2))
@@ -0,0 +1,307 @@
+# --- Agora Storage ---
+# The app reads and writes worksheets through a storage object instead of a
+# gspread Spreadsheet directly. SheetsStorage keeps the original behaviour;
+# SQLiteStorage keeps every tab in a local SQLite file (with Google Sheets as
+# an optional sync target), so submissions and reads stay local.
+
+import re
+import sqlite3
+import threading
+
+import gspread
+import pandas as pd
+
+# Columns that get an index whenever a tab has them
+INDEXED_COLUMNS = ("headline", "timestamp", "reflection_id")
+
+# Every tab and its header row; shared by both apps and the digest builder
+# so rows written by one are read correctly by the others
+AGORA_TABS = {
+    "Reflections": ["reflection_id", "headline", "emotions", "trust_level", "reflection", "timestamp"],
+    "Replies": ["reflection_id", "reply", "timestamp"],
+    "CommentReactions": ["headline", "comment_snippet", "reaction", "timestamp", "post_id", "comment_id"],
+    "CommentReflections": ["field_name", "headline", "comment_snippet", "reflection", "emotion", "timestamp", "post_id", "comment_id"],
+    "SavedPosts": ["id", "title", "top_comments", "date_saved", "permalink"],
+    "FieldNames": ["field_name", "timestamp"],
+    "AI_Feedback": ["Headline", "Question", "AI Response", "Feedback", "Comment", "Timestamp"],
+}
+
+
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def a1_sheet(name):
+    return "'" + str(name).replace("'", "''") + "'"
+
+
+class WatchedWorksheet:
+    # Passes everything through to a gspread worksheet, reporting writes
+    # to the storage's on_write listeners.
+    def __init__(self, ws, notify):
+        self.ws = ws
+        self.notify = notify
+        self.title = ws.title
+
+    def append_row(self, values, **kwargs):
+        result = self.ws.append_row(values, **kwargs)
+        self.notify(self.title)
+        return result
+
+    def append_rows(self, values, **kwargs):
+        result = self.ws.append_rows(values, **kwargs)
+        self.notify(self.title)
+        return result
+
+    def delete_rows(self, start, end=None):
+        result = self.ws.delete_rows(start, end)
+        self.notify(self.title)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+class StorageListeners:
+    def __init__(self):
+        self.listeners = []
+
+    def on_write(self, callback):
+        # callback(name) runs after every append or delete on a tab
+        self.listeners.append(callback)
+
+    def notify(self, name):
+        for callback in self.listeners:
+            callback(name)
+
+
+# --- Google Sheets backend ---
+class SheetsStorage(StorageListeners):
+    def __init__(self, spreadsheet, write_queue=None, delta_sync=None):
+        super().__init__()
+        self.spreadsheet = spreadsheet
+        self.write_queue = write_queue
+        self.delta_sync = delta_sync
+        self.worksheets = {}
+        self.raw = {}  # title -> (unwrapped gspread worksheet, headers), for delta reads
+
+    def get_or_create(self, name, headers):
+        if name in self.worksheets:
+            return self.worksheets[name]
+        try:
+            ws = self.spreadsheet.worksheet(name)
+        except gspread.exceptions.WorksheetNotFound:
+            ws = self.spreadsheet.add_worksheet(title=name, rows="1000", cols="20")
+            ws.append_row(headers)
+        return self._register(ws, headers)
+
+    def bootstrap(self, tabs):
+        # Resolve every tab ({name: headers}) with one metadata fetch, create the
+        # missing ones in one batch update and pull their contents in one batch get.
+        metadata = self.spreadsheet.fetch_sheet_metadata()
+        properties = {s["properties"]["title"]: s["properties"] for s in metadata.get("sheets", [])}
+        missing = [name for name in tabs if name not in properties]
+        if missing:
+            reply = self.spreadsheet.batch_update({"requests": [
+                {"addSheet": {"properties": {"title": name, "gridProperties": {"rowCount": 1000, "columnCount": 20}}}}
+                for name in missing
+            ]})
+            for added in reply.get("replies", []):
+                props = added["addSheet"]["properties"]
+                properties[props["title"]] = props
+            self.spreadsheet.values_batch_update({
+                "valueInputOption": "RAW",
+                "data": [{"range": f"{a1_sheet(name)}!A1", "values": [list(tabs[name])]} for name in missing],
+            })
+        names = list(tabs)
+        response = self.spreadsheet.values_batch_get([a1_sheet(name) for name in names])
+        header_updates = []
+        for name, value_range in zip(names, response.get("valueRanges", [])):
+            values = value_range.get("values", [])
+            headers = list(tabs[name])
+            if values and len(values[0]) < len(headers) and headers[:len(values[0])] == values[0]:
+                # Tab predates newer columns; extend its header row in place
+                header_updates.append({"range": f"{a1_sheet(name)}!A1", "values": [headers]})
+                values = [headers] + values[1:]
+            ws = gspread.Worksheet(self.spreadsheet, properties[name], self.spreadsheet.id, self.spreadsheet.client)
+            self._register(ws, headers)
+            if self.delta_sync is not None:
+                self.delta_sync.seed(name, values, headers)
+        if header_updates:
+            self.spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": header_updates})
+
+    def _register(self, ws, headers):
+        self.raw[ws.title] = (ws, list(headers))
+        if self.write_queue is not None:
+            # Appends become non-blocking and are batched into append_rows
+            ws = self.write_queue.register(ws, headers)
+        ws = WatchedWorksheet(ws, self.notify)
+        self.worksheets[ws.title] = ws
+        return ws
+
+    def load_records(self, name):
+        return self.worksheets[name].get_all_records()
+
+    def load_frame(self, name):
+        ws = self.worksheets[name]
+        if self.delta_sync is None:
+            return pd.DataFrame(ws.get_all_records())
+        # Only rows appended since the last read are fetched. Reads go to the plain
+        # worksheet so the stored row offset only counts rows really on the sheet;
+        # queued rows are added below, once.
+        raw_ws, headers = self.raw[name]
+        frame = self.delta_sync.frame(raw_ws, headers)
+        pending = ws.pending() if hasattr(ws, "pending") else []
+        if pending:
+            headers = list(frame.columns)
+            rows = [list(r)[:len(headers)] + [""] * (len(headers) - len(r)) for r in pending]
+            frame = pd.concat([frame, pd.DataFrame(rows, columns=headers)], ignore_index=True)
+        return frame
+
+
+# --- SQLite backend ---
+class SQLiteWorksheet:
+    # Small gspread-compatible surface so existing call sites
+    # (append_row / get_all_records / get_all_values) keep working.
+    def __init__(self, storage, title, headers, mirror=None):
+        self.storage = storage
+        self.title = title
+        self.headers = list(headers)
+        self.mirror = mirror
+        self.table = quote_ident(title)
+        self.columns = ", ".join(quote_ident(h) for h in self.headers)
+
+    def _pad(self, row):
+        row = list(row)[:len(self.headers)]
+        return row + [""] * (len(self.headers) - len(row))
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        rows = [self._pad(r) for r in values]
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in self.headers)
+        with self.storage.lock:
+            self.storage.conn.executemany(
+                f"INSERT INTO {self.table} ({self.columns}) VALUES ({placeholders})", rows
+            )
+            self.storage.conn.commit()
+        self.storage.notify(self.title)
+        if self.mirror is not None:
+            self.mirror.append_rows(rows, value_input_option="RAW")
+
+    def _select(self):
+        with self.storage.lock:
+            return self.storage.conn.execute(
+                f"SELECT {self.columns} FROM {self.table} ORDER BY rowid"
+            ).fetchall()
+
+    def get_all_records(self):
+        return [
+            {h: ("" if v is None else v) for h, v in zip(self.headers, row)}
+            for row in self._select()
+        ]
+
+    def get_all_values(self):
+        values = [list(self.headers)]
+        for row in self._select():
+            values.append(["" if v is None else str(v) for v in row])
+        return values
+
+    # --- Row-range helpers used by retention (1-based rows, row 1 is the header) ---
+    def count_rows(self):
+        with self.storage.lock:
+            return self.storage.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def row_values(self, row):
+        return list(self.headers) if row == 1 else self.get(f"A{row}:A{row}")[0]
+
+    def get(self, a1_range):
+        # Only the row part of the range is honoured; all columns are returned
+        match = re.match(r"^[A-Z]*(\d*):[A-Z]*(\d*)$", a1_range)
+        start = int(match.group(1) or 1) if match else 1
+        end = int(match.group(2)) if match and match.group(2) else None
+        values = [list(self.headers)] if start == 1 else []
+        limit = -1 if end is None else end - max(start, 2) + 1
+        with self.storage.lock:
+            rows = self.storage.conn.execute(
+                f"SELECT {self.columns} FROM {self.table} ORDER BY rowid LIMIT ? OFFSET ?",
+                (limit, max(start - 2, 0)),
+            ).fetchall()
+        values.extend(["" if v is None else str(v) for v in row] for row in rows)
+        return values
+
+    def delete_rows(self, start, end=None):
+        end = end or start
+        with self.storage.lock:
+            self.storage.conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"(SELECT rowid FROM {self.table} ORDER BY rowid LIMIT ? OFFSET ?)",
+                (end - start + 1, max(start - 2, 0)),
+            )
+            self.storage.conn.commit()
+        self.storage.notify(self.title)
+
+
+class SQLiteStorage(StorageListeners):
+    def __init__(self, path="agora.db", mirror=None):
+        super().__init__()
+        self.path = path
+        self.mirror = mirror
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.worksheets = {}
+
+    def bootstrap(self, tabs):
+        if self.mirror is not None:
+            self.mirror.bootstrap(tabs)
+        for name, headers in tabs.items():
+            self.get_or_create(name, headers)
+
+    def get_or_create(self, name, headers):
+        if name in self.worksheets:
+            return self.worksheets[name]
+        table = quote_ident(name)
+        with self.lock:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(quote_ident(h) for h in headers)})"
+            )
+            # Tabs can gain columns over time; add any the table is missing
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for h in headers:
+                if h not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {quote_ident(h)}")
+            for h in headers:
+                if h in INDEXED_COLUMNS:
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'idx_{name}_{h}')} "
+                        f"ON {table} ({quote_ident(h)})"
+                    )
+            self.conn.commit()
+        mirror_ws = self.mirror.get_or_create(name, headers) if self.mirror is not None else None
+        ws = SQLiteWorksheet(self, name, headers, mirror=mirror_ws)
+        self.worksheets[name] = ws
+        return ws
+
+    def load_records(self, name):
+        return self.worksheets[name].get_all_records()
+
+    def load_frame(self, name):
+        return pd.DataFrame(self.load_records(name))
+
+
+def open_storage(config, open_spreadsheet, write_queue=None, delta_sync=None):
+    # config is the [storage] secrets table:
+    #   backend = "sheets" | "sqlite", path = "agora.db", sync_to_sheets = true/false
+    # open_spreadsheet is only called when Google Sheets is actually needed.
+    # write_queue (optional) batches every append that goes to Google Sheets;
+    # delta_sync (optional) makes Sheets reads fetch only newly appended rows.
+    config = dict(config or {})
+    if config.get("backend", "sheets") == "sqlite":
+        mirror = SheetsStorage(open_spreadsheet(), write_queue) if config.get("sync_to_sheets") else None
+        return SQLiteStorage(config.get("path", "agora.db"), mirror=mirror)
+    return SheetsStorage(open_spreadsheet(), write_queue, delta_sync)
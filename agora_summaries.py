@@ -0,0 +1,174 @@
+# --- Agora Summary Cache ---
+# AI summaries keyed by (post id or headline, fingerprint of the comments
+# that actually went into the prompt, model, prompt version). The same
+# comments summarized by the same prompt are served from memory or SQLite
+# instead of paying for the same tokens again; a new comment making it into
+# the prompt changes the fingerprint. Entries expire after a TTL, and the
+# least recently used ones are evicted beyond max_entries.
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Bump SUMMARY_PROMPT_VERSION whenever summary_prompt changes, so cached summaries aren't reused
+SUMMARY_MODEL = "gpt-4"
+SUMMARY_PROMPT_VERSION = "1"
+SUMMARY_SYSTEM_PROMPT = "You are a neutral news sentiment summarizer."
+
+
+def included_comments(grouped_comments, per_label=2):
+    # The (label, text) pairs a summary prompt quotes: the first few of each group
+    return [(label, c["text"]) for label, comments in grouped_comments.items() for c in comments[:per_label]]
+
+
+def comments_fingerprint(comments):
+    digest = hashlib.sha256()
+    for label, text in comments:
+        digest.update(f"{label}\x1f{text}\x1e".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def summary_prompt(headline, grouped_comments, per_label=2):
+    prompt = f"Headline: {headline}\n"
+    for label, comments in grouped_comments.items():
+        prompt += f"\n{label} Comments:\n"
+        for c in comments[:per_label]:
+            prompt += f"- {c['text']}\n"
+    prompt += "\nSummarize public sentiment in 2-3 sentences."
+    return prompt
+
+
+def request_summary(client, headline, grouped_comments, model=SUMMARY_MODEL):
+    # One chat completion; shared by the app and the digest builder so both hit the same cache entries
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": summary_prompt(headline, grouped_comments)}
+        ],
+        max_tokens=250,
+        temperature=0.7,
+    )
+    return response.choices[0].message.content.strip()
+
+
+class SummaryCache:
+    def __init__(self, path="agora.db", ttl=6 * 3600, max_entries=5000, memory_entries=500, touch_batch=50):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> (summary, created_at)
+        self.pending = {}            # key -> lock held while that summary is generated
+        self.touched = {}            # key -> last memory hit not yet written to used_at
+        self.touch_batch = touch_batch
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                subject TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (subject, fingerprint, model, prompt_version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_summary_cache_used ON summary_cache (used_at);
+        """)
+        self.conn.commit()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+
+    def key(self, subject, grouped_comments, model, prompt_version, per_label=2):
+        return (str(subject), comments_fingerprint(included_comments(grouped_comments, per_label)), model, str(prompt_version))
+
+    def _remember(self, key, summary, created_at):
+        self.memory[key] = (summary, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _flush_touched(self):
+        # Memory hits move used_at on disk too, in batches, so the on-disk LRU
+        # doesn't evict the summaries served most often
+        if self.touched:
+            with self.conn:
+                self.conn.executemany("""
+                    UPDATE summary_cache SET used_at = ?
+                    WHERE subject = ? AND fingerprint = ? AND model = ? AND prompt_version = ?
+                """, [(used,) + key for key, used in self.touched.items()])
+            self.touched.clear()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            hit = self.memory.get(key)
+            if hit is not None and now - hit[1] < self.ttl:
+                self.memory.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                self.touched[key] = now
+                if len(self.touched) >= self.touch_batch:
+                    self._flush_touched()
+                return hit[0]
+            row = self.conn.execute("""
+                SELECT summary, created_at FROM summary_cache
+                WHERE subject = ? AND fingerprint = ? AND model = ? AND prompt_version = ?
+            """, key).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                return None
+            with self.conn:
+                self.conn.execute("""
+                    UPDATE summary_cache SET used_at = ?
+                    WHERE subject = ? AND fingerprint = ? AND model = ? AND prompt_version = ?
+                """, (now,) + key)
+            self._remember(key, row[0], row[1])
+            self.metrics["disk_hits"] += 1
+            return row[0]
+
+    def put(self, key, summary):
+        now = time.time()
+        with self.lock:
+            self._remember(key, summary, now)
+            # Pending memory hits count before anything is evicted
+            self._flush_touched()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO summary_cache VALUES (?, ?, ?, ?, ?, ?, ?)", key + (summary, now, now))
+                expired = self.conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+                excess = self.conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    self.conn.execute("""
+                        DELETE FROM summary_cache WHERE rowid IN (
+                            SELECT rowid FROM summary_cache ORDER BY used_at LIMIT ?
+                        )
+                    """, (excess,))
+            self.metrics["evicted"] += expired + max(excess, 0)
+
+    def summarize(self, subject, grouped_comments, model, prompt_version, generate, per_label=2):
+        # generate() is only called on a miss; its exceptions propagate and nothing is cached
+        key = self.key(subject, grouped_comments, model, prompt_version, per_label)
+        summary = self.get(key)
+        if summary is not None:
+            return summary
+        # Sessions asking for the same summary at once wait for a single API call
+        with self.lock:
+            key_lock = self.pending.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                summary = self.get(key)
+                if summary is None:
+                    with self.lock:
+                        self.metrics["misses"] += 1
+                    summary = generate()
+                    self.put(key, summary)
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+        return summary
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+        return dict(self.metrics, entries=entries, memory=len(self.memory))
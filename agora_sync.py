@@ -0,0 +1,120 @@
+# --- Agora Delta Sync ---
+# Keeps an in-memory columnar copy of each Google Sheets tab and, on refresh,
+# fetches only the rows appended since the last read (A{n}:F). The first data
+# row is re-read in the same request as a fingerprint: if it changed, rows have
+# shifted (retention trim, manual edits) and the tab is reloaded in full.
+# Reads hit the network outside the lock and merge under it, so a slow
+# Sheets call never blocks readers of other tabs.
+
+import threading
+
+import pandas as pd
+from gspread.exceptions import APIError
+from gspread.utils import numericise_all
+
+from agora_retention import column_letter
+
+
+def _trimmed(row):
+    # The values API drops trailing empty cells; compare rows without them
+    row = [str(v) for v in row]
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+class DeltaSync:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}   # title -> {"headers", "columns", "rows", "first_row"}
+        self.shifted = set()
+        self.versions = {}  # title -> bumped on every load, append and shift
+        self.metrics = {"full_loads": 0, "delta_loads": 0, "rows_fetched": 0}
+
+    def seed(self, title, values, headers=()):
+        # Prime a tab from values fetched elsewhere (e.g. the bootstrap batch get)
+        with self.lock:
+            self._load_values(title, values, headers)
+
+    def mark_shifted(self, title):
+        with self.lock:
+            self.shifted.add(title)
+            self._bump(title)
+
+    def frame(self, ws, headers=()):
+        # ws must be the plain gspread worksheet, not a queue wrapper that adds pending rows
+        title = ws.title
+        with self.lock:
+            version = self.versions.get(title, 0)
+            table = self.tables.get(title)
+            full = table is None or title in self.shifted
+            if not full:
+                width, rows, first_row = len(table["headers"]), table["rows"], table["first_row"]
+        if full:
+            values = ws.get_all_values()
+        else:
+            first, new_rows = self._fetch_delta(ws, width, rows)
+        reload = False
+        with self.lock:
+            # Merge only if no other read or shift touched the tab meanwhile; otherwise
+            # theirs is at least as fresh (or the tab is reloaded on the next read)
+            if self.versions.get(title, 0) == version or title not in self.tables:
+                if full:
+                    self._load_values(title, values, headers)
+                    self.metrics["full_loads"] += 1
+                elif rows and first != first_row:
+                    self.shifted.add(title)
+                    self._bump(title)
+                    reload = True
+                else:
+                    self._append(self.tables[title], new_rows)
+                    self._bump(title)
+                    self.metrics["delta_loads"] += 1
+            if not reload:
+                table = self.tables[title]
+                return pd.DataFrame({h: list(col) for h, col in table["columns"].items()}, columns=table["headers"])
+        # Rows shifted under us: reload in full
+        return self.frame(ws, headers)
+
+    def stats(self):
+        with self.lock:
+            snapshot = dict(self.metrics)
+            snapshot["rows_by_worksheet"] = {t: table["rows"] for t, table in self.tables.items()}
+        return snapshot
+
+    # --- Internals ---
+    def _fetch_delta(self, ws, width, rows):
+        # (fingerprint row, rows appended since the last read), in one request
+        last_col = column_letter(max(width, 1))
+        next_row = rows + 2   # +1 for the header, +1 for the first unseen row
+        try:
+            first, new_rows = ws.batch_get([f"A2:{last_col}2", f"A{next_row}:{last_col}"])
+        except APIError as e:
+            if "exceeds grid limits" not in str(e):
+                raise
+            # The grid ends at our last row (e.g. right after a retention trim): nothing new yet
+            first = ws.batch_get([f"A2:{last_col}2"])[0] if rows else []
+            new_rows = []
+        return (_trimmed(first[0]) if first else []), new_rows
+
+    def _bump(self, title):
+        self.versions[title] = self.versions.get(title, 0) + 1
+
+    def _load_values(self, title, values, default_headers=()):
+        headers = list(values[0]) if values else list(default_headers)
+        table = {"headers": headers, "columns": {h: [] for h in headers}, "rows": 0, "first_row": []}
+        self._append(table, values[1:])
+        self.tables[title] = table
+        self.shifted.discard(title)
+        self._bump(title)
+
+    def _append(self, table, rows):
+        width = len(table["headers"])
+        for raw in rows:
+            if not table["rows"]:
+                table["first_row"] = _trimmed(raw)
+            row = numericise_all(list(raw)[:width] + [""] * (width - len(raw)))
+            for h, v in zip(table["headers"], row):
+                table["columns"][h].append(v)
+            table["rows"] += 1
+        self.metrics["rows_fetched"] += len(rows)
@@ -0,0 +1,112 @@
+# --- Agora Comment Filter ---
+# Normalizes comment text and drops low-signal comments before anything is
+# scored or sent to a summary prompt. Patterns are compiled once; comments
+# stream through one at a time and every rule counts what it removed into
+# the caller's counts dict, so one CommentFilter can be shared by every
+# session and thread.
+#
+#   deleted      "[deleted]" / "[removed]" bodies
+#   bot          known bot accounts, "I am a bot" boilerplate
+#   short        fewer than min_length characters left after clean-up
+#   duplicate    same text as an earlier comment (case/space-insensitive)
+#   near_duplicate  shingle Jaccard >= threshold with an earlier comment
+
+import html
+import re
+from collections import namedtuple
+
+from agora_dedup import NearDuplicateIndex
+
+MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\((?:[^()]|\([^)]*\))*\)")
+URL = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+QUOTE_LINE = re.compile(r"^\s*>.*$", re.MULTILINE)
+EMPHASIS = re.compile(r"(\*\*|__|~~|\*|`+|^#+\s*|^\s*[-*+]\s+|\^)", re.MULTILINE)
+SPOILER = re.compile(r">!|!<")
+WHITESPACE = re.compile(r"\s+")
+DELETED = re.compile(r"^\s*\[(deleted|removed)\]\s*$", re.IGNORECASE)
+BOT_FOOTER = re.compile(
+    r"i am a bot|this action was performed automatically|beep boop|^\s*\^?\(?i'?m a bot", re.IGNORECASE
+)
+BOT_AUTHORS = {"automoderator", "remindmebot", "sneakpeekbot", "wikitextbot", "totesmessenger", "repostsleuthbot"}
+
+FILTER_RULES = ("deleted", "bot", "short", "duplicate", "near_duplicate")
+
+# LSH tuned for the 0.8 default: (1/16)^(1/8) ~ 0.71, so pairs at 0.8 almost always
+# share a band while the loose overlap between unrelated comments rarely does
+NEAR_DUPLICATE_BANDS = 16
+NEAR_DUPLICATE_ROWS = 8
+NEAR_DUPLICATE_MAX_BUCKET = 32
+
+# NearDuplicateIndex works on anything with id / title / url
+_TextItem = namedtuple("_TextItem", "id title url")
+
+
+def normalize(text):
+    # Markdown and URLs out, quoted replies out, entities decoded, whitespace collapsed
+    text = html.unescape(text or "")
+    text = QUOTE_LINE.sub(" ", text)
+    text = MARKDOWN_LINK.sub(r"\1", text)
+    text = URL.sub(" ", text)
+    text = SPOILER.sub("", text)
+    text = EMPHASIS.sub("", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def is_bot(author, body):
+    # Known accounts and bot footers only; a name ending in "bot" (Talbot, Abbot) proves nothing
+    return str(author or "").lower() in BOT_AUTHORS or bool(BOT_FOOTER.search(body or ""))
+
+
+def filter_counts():
+    # Removals per rule plus "kept", filled in by CommentFilter.run
+    return dict.fromkeys(FILTER_RULES + ("kept",), 0)
+
+
+def filter_summary(counts):
+    # "3 deleted, 1 bot" style caption of what was removed
+    return ", ".join(f"{n} {rule.replace('_', '-')}" for rule, n in counts.items() if n and rule in FILTER_RULES)
+
+
+class CommentFilter:
+    def __init__(self, min_length=10, near_duplicate_threshold=0.8):
+        self.min_length = min_length
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+    def run(self, comments, counts=None):
+        # Yields (comment, clean text) for every comment worth keeping; duplicates
+        # are judged within one run. counts, if given, comes from filter_counts().
+        counts = filter_counts() if counts is None else counts
+        seen = set()
+        near = None
+        if self.near_duplicate_threshold:
+            near = NearDuplicateIndex(
+                threshold=self.near_duplicate_threshold, bands=NEAR_DUPLICATE_BANDS,
+                rows=NEAR_DUPLICATE_ROWS, max_bucket=NEAR_DUPLICATE_MAX_BUCKET,
+            )
+        for i, comment in enumerate(comments):
+            body = getattr(comment, "body", "") or ""
+            if DELETED.match(body):
+                counts["deleted"] += 1
+                continue
+            if is_bot(getattr(comment, "author", ""), body):
+                counts["bot"] += 1
+                continue
+            text = normalize(body)
+            if len(text) < self.min_length:
+                counts["short"] += 1
+                continue
+            key = text.lower()
+            if key in seen:
+                counts["duplicate"] += 1
+                continue
+            seen.add(key)
+            if near is not None:
+                item = _TextItem(str(i), text, "")
+                if near.add(item) != item.id:
+                    counts["near_duplicate"] += 1
+                    continue
+            counts["kept"] += 1
+            yield comment, text
+
+    def filter(self, comments, counts=None):
+        return list(self.run(comments, counts))
@@ -0,0 +1,107 @@
+# --- Agora Thread Mood ---
+# Sentiment over the whole reply forest, not just the top-level comments.
+# A flattened comment tree becomes parallel arrays (parent index, depth,
+# score); every scored comment gets a weight that grows with its score and
+# shrinks with its depth, and subtree totals are folded upwards one depth
+# level at a time with np.add.at. A thread of thousands of comments costs
+# a handful of array passes and no recursion over PRAW objects.
+
+from collections import namedtuple
+
+import numpy as np
+
+# mood / weight / size are per comment and cover the comment plus all its replies
+SubtreeSentiment = namedtuple("SubtreeSentiment", "mood weight size")
+ThreadMood = namedtuple("ThreadMood", "polarity top_level comments scored subtrees")
+
+
+class CommentForest:
+    def __init__(self, records):
+        self.records = list(records)
+        n = len(self.records)
+        position = {r.fullname: i for i, r in enumerate(self.records)}
+        self.index = {r.id: i for i, r in enumerate(self.records)}
+        # -1 for top-level comments, and for replies whose parent wasn't fetched
+        self.parent = np.fromiter((position.get(r.parent_id, -1) for r in self.records), dtype=np.int64, count=n)
+        self.score = np.fromiter((r.score or 0 for r in self.records), dtype=float, count=n)
+        self.depth = self._depths()
+        self.roots = np.flatnonzero(self.parent < 0)
+        # Comment indices per depth, deepest level last
+        order = np.argsort(self.depth, kind="stable")
+        bounds = np.searchsorted(self.depth[order], np.arange(self.max_depth + 2))
+        self.levels = [order[bounds[d]:bounds[d + 1]] for d in range(self.max_depth + 1)]
+
+    def _depths(self):
+        # Walk every comment's ancestor chain in lock-step; one pass per tree level,
+        # and correct whatever order the records arrive in
+        depth = np.zeros(len(self.records), dtype=np.int64)
+        ancestor = self.parent.copy()
+        for _ in range(len(self.records)):
+            alive = ancestor >= 0
+            if not alive.any():
+                break
+            depth += alive
+            ancestor[alive] = self.parent[ancestor[alive]]
+        return depth
+
+    @property
+    def max_depth(self):
+        return int(self.depth.max()) if len(self.depth) else 0
+
+    def polarities(self, by_id):
+        # {comment id: polarity} -> array aligned with the records; NaN where unscored
+        values = np.full(len(self.records), np.nan)
+        for comment_id, polarity in by_id.items():
+            i = self.index.get(comment_id)
+            if i is not None and polarity is not None:
+                values[i] = polarity
+        return values
+
+
+def comment_weights(forest, depth_discount=0.7):
+    # Upvoted comments count more (log-damped); each reply level counts depth_discount times less
+    return (1.0 + np.log1p(np.maximum(forest.score, 0.0))) * depth_discount ** forest.depth
+
+
+def subtree_sentiment(forest, polarity, depth_discount=0.7):
+    # Weighted mean polarity of every comment's subtree. Unscored comments carry
+    # no weight of their own but still pass their replies up to their parent.
+    polarity = np.asarray(polarity, dtype=float)
+    known = ~np.isnan(polarity)
+    weight = np.where(known, comment_weights(forest, depth_discount), 0.0)
+    mass = weight * np.where(known, polarity, 0.0)
+    size = np.ones(len(forest.records))
+    for level in reversed(forest.levels[1:]):
+        parents = forest.parent[level]
+        np.add.at(mass, parents, mass[level])
+        np.add.at(weight, parents, weight[level])
+        np.add.at(size, parents, size[level])
+    mood = np.full(len(forest.records), np.nan)
+    np.divide(mass, weight, out=mood, where=weight > 0)
+    return SubtreeSentiment(mood, weight, size)
+
+
+def thread_mood(forest, polarity, depth_discount=0.7):
+    # The depth discount is a common factor inside any one subtree, so a subtree's
+    # mood doesn't depend on how deep it starts; the thread mood combines the roots
+    subtrees = subtree_sentiment(forest, polarity, depth_discount)
+    roots = forest.roots
+    root_weight = subtrees.weight[roots]
+    total = root_weight.sum()
+    overall = float(np.nansum(subtrees.mood[roots] * root_weight) / total) if total else None
+    # What the old top-level-only view saw, for comparison
+    own = np.asarray(polarity, dtype=float)[roots]
+    scored = ~np.isnan(own)
+    top_level = float(own[scored].mean()) if scored.any() else None
+    n_scored = int((~np.isnan(np.asarray(polarity, dtype=float))).sum())
+    return ThreadMood(overall, top_level, len(forest.records), n_scored, subtrees)
+
+
+def heaviest_threads(forest, subtrees, limit=5):
+    # Top-level comments whose conversations carry the most weight
+    roots = forest.roots[subtrees.weight[forest.roots] > 0]
+    order = np.argsort(-subtrees.weight[roots], kind="stable")[:limit]
+    return [
+        (forest.records[i], float(subtrees.mood[i]), int(subtrees.size[i]) - 1)
+        for i in roots[order]
+    ]
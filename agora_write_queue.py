@@ -0,0 +1,209 @@
+# --- Agora Write-Behind Queue ---
+# Worksheet appends are collected per tab and flushed in the background with a
+# single append_rows call once a batch is big enough or old enough. Every row
+# is written to a local journal before it is acknowledged, so a crash or
+# restart replays whatever had not reached Google Sheets yet.
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+class QueuedWorksheet:
+    # Drop-in wrapper around a gspread worksheet: appends go to the queue,
+    # everything else is passed through to the real worksheet.
+    def __init__(self, ws, queue, headers):
+        self.ws = ws
+        self.queue = queue
+        self.headers = list(headers)
+        self.title = ws.title
+
+    def append_row(self, values, **kwargs):
+        self.queue.enqueue(self.title, [values])
+
+    def append_rows(self, values, **kwargs):
+        self.queue.enqueue(self.title, values)
+
+    def get_all_records(self, *args, **kwargs):
+        # Rows still waiting in the queue are included so a user sees their own write
+        records = self.ws.get_all_records(*args, **kwargs)
+        for row in self.queue.pending_rows(self.title):
+            row = list(row) + [""] * (len(self.headers) - len(row))
+            records.append(dict(zip(self.headers, row)))
+        return records
+
+    def get_all_values(self, *args, **kwargs):
+        values = self.ws.get_all_values(*args, **kwargs)
+        values.extend([str(v) for v in row] for row in self.queue.pending_rows(self.title))
+        return values
+
+    def pending(self):
+        return self.queue.pending_rows(self.title)
+
+    def flush(self):
+        self.queue.flush(self.title)
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+class WriteBehindQueue:
+    def __init__(self, journal_path="agora_write_journal.jsonl", batch_size=50, max_delay=2.0, retry_delay=10.0):
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.cond = threading.Condition()
+        self.pending = defaultdict(list)   # title -> rows not yet on the sheet
+        self.oldest = {}                   # title -> time the oldest pending row was queued
+        self.retry_at = {}                 # title -> earliest retry after a failed flush
+        self.worksheets = {}               # title -> real gspread worksheet
+        self.flushing = set()              # titles with an append_rows call in flight
+        self.metrics = {
+            "batches_flushed": 0,
+            "rows_flushed": 0,
+            "last_batch_size": 0,
+            "last_flush_latency": 0.0,
+            "total_flush_latency": 0.0,
+            "flush_errors": 0,
+            "last_error": "",
+        }
+        self._replay_journal()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="agora-write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # --- Public API ---
+    def register(self, ws, headers):
+        with self.cond:
+            self.worksheets[ws.title] = ws
+            if self.pending.get(ws.title):
+                self.cond.notify()
+        return QueuedWorksheet(ws, self, headers)
+
+    def enqueue(self, title, rows):
+        rows = [list(r) for r in rows]
+        if not rows:
+            return
+        with self.cond:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"ws": title, "row": row}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending[title].extend(rows)
+            self.oldest.setdefault(title, time.monotonic())
+            if len(self.pending[title]) >= self.batch_size:
+                self.cond.notify()
+
+    def pending_rows(self, title):
+        with self.cond:
+            return list(self.pending.get(title, []))
+
+    def flush(self, title=None):
+        # Synchronous flush, e.g. before a bulk read or at shutdown
+        titles = [title] if title else list(self.pending)
+        for t in titles:
+            self._flush_one(t)
+
+    def stats(self):
+        with self.cond:
+            snapshot = dict(self.metrics)
+            snapshot["queue_depth"] = sum(len(rows) for rows in self.pending.values())
+            snapshot["depth_by_worksheet"] = {t: len(rows) for t, rows in self.pending.items() if rows}
+        batches = snapshot["batches_flushed"]
+        snapshot["avg_batch_size"] = snapshot["rows_flushed"] / batches if batches else 0.0
+        snapshot["avg_flush_latency"] = snapshot["total_flush_latency"] / batches if batches else 0.0
+        return snapshot
+
+    def close(self):
+        if self.closed:
+            return
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join(timeout=5)
+        self.flush()
+
+    # --- Internals ---
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash mid-line
+                self.pending[entry["ws"]].append(entry["row"])
+                self.oldest.setdefault(entry["ws"], time.monotonic())
+
+    def _rewrite_journal(self):
+        # Called with self.cond held; keeps only rows that are still pending
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for title, rows in self.pending.items():
+                for row in rows:
+                    f.write(json.dumps({"ws": title, "row": row}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _due(self, now):
+        due = []
+        for title, rows in self.pending.items():
+            if not rows or title not in self.worksheets:
+                continue
+            if self.retry_at.get(title, 0) > now:
+                continue
+            if len(rows) >= self.batch_size or now - self.oldest.get(title, now) >= self.max_delay:
+                due.append(title)
+        return due
+
+    def _flush_one(self, title):
+        with self.cond:
+            ws = self.worksheets.get(title)
+            batch = list(self.pending.get(title, []))
+            if ws is None or not batch or title in self.flushing:
+                return
+            self.flushing.add(title)
+        start = time.monotonic()
+        try:
+            ws.append_rows(batch, value_input_option="RAW")
+        except Exception as e:
+            with self.cond:
+                self.flushing.discard(title)
+                self.metrics["flush_errors"] += 1
+                self.metrics["last_error"] = f"{title}: {e}"
+                self.retry_at[title] = time.monotonic() + self.retry_delay
+            return
+        latency = time.monotonic() - start
+        with self.cond:
+            self.flushing.discard(title)
+            # Rows queued while we were flushing stay pending
+            self.pending[title] = self.pending[title][len(batch):]
+            if self.pending[title]:
+                self.oldest[title] = time.monotonic()
+            else:
+                self.oldest.pop(title, None)
+            self.retry_at.pop(title, None)
+            self._rewrite_journal()
+            self.metrics["batches_flushed"] += 1
+            self.metrics["rows_flushed"] += len(batch)
+            self.metrics["last_batch_size"] = len(batch)
+            self.metrics["last_flush_latency"] = latency
+            self.metrics["total_flush_latency"] += latency
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if self.closed:
+                    return
+                self.cond.wait(timeout=min(self.max_delay, 1.0))
+                due = self._due(time.monotonic())
+            for title in due:
+                self._flush_one(title)
@@ -6,10 +6,13 @@ import pandas as pd
 import praw
 import gspread
 from google.oauth2.service_account import Credentials
-from textblob import TextBlob
+from agora_sentiment import get_backend
 from collections import defaultdict
 from datetime import datetime, timedelta
 from openai import OpenAI
+from agora_reddit import get_reddit_pool, search_subreddits
+from agora_cassette import authorize_sheets, open_cassette, openai_kwargs, reddit_kwargs
+from agora_summaries import SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, SummaryCache, request_summary
 import uuid
 from PIL import Image
 import plotly.express as px
@@ -289,32 +292,36 @@ def save_headline_snapshot(post):
         permalink
     ])
 
-def generate_ai_summary(headline, grouped_comments):
-    prompt = f"Headline: {headline}\n"
-    for label, comments in grouped_comments.items():
-        prompt += f"\n{label} Comments:\n"
-        for c in comments[:2]:
-            prompt += f"- {c['text']}\n"
-    prompt += "\nSummarize public sentiment in 2-3 sentences."
+@st.cache_resource
+def get_summary_cache():
+    config = dict(st.secrets.get("summaries", {}))
+    return SummaryCache(
+        config.get("path", dict(st.secrets.get("storage", {})).get("path", "agora.db")),
+        ttl=config.get("ttl", 6 * 3600),
+        max_entries=config.get("max_entries", 5000),
+    )
+
+def generate_ai_summary(headline, grouped_comments, subject=None):
+    def complete():
+        client = OpenAI(api_key=st.secrets["openai"]["api_key"], **openai_kwargs(cassette))
+        return request_summary(client, headline, grouped_comments)
     try:
-        client = OpenAI(api_key=st.secrets["openai"]["api_key"])
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a neutral news sentiment summarizer."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=250,
-            temperature=0.7,
+        return get_summary_cache().summarize(
+            subject or headline, grouped_comments, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, complete
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return f"Could not generate summary: {str(e)}"
 
 # --- Google Sheets ---
 SCOPE = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
 creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
-client = gspread.authorize(creds)
+@st.cache_resource
+def get_cassette():
+    # One cassette per process; a new one on every rerun would restart replay positions
+    return open_cassette(st.secrets.get("cassette", {}))
+
+cassette = get_cassette()
+client = authorize_sheets(creds, cassette)
 sheet = client.open("AgoraData")
 
 reflections_ws = get_or_create_worksheet(sheet, "Reflections", ["reflection_id", "headline", "emotions", "trust_level", "reflection", "timestamp"])
@@ -327,9 +334,16 @@ saved_posts_ws = get_or_create_worksheet(sheet, "SavedPosts", ["id", "title", "t
 reddit = praw.Reddit(
     client_id=st.secrets["reddit"]["client_id"],
     client_secret=st.secrets["reddit"]["client_secret"],
-    user_agent=st.secrets["reddit"]["user_agent"]
+    user_agent=st.secrets["reddit"]["user_agent"],
+    **reddit_kwargs(cassette)
 )
 
+SEARCH_TIMEOUT = 10  # seconds per subreddit search request
+SEARCH_WORKERS = dict(st.secrets.get("topic_search", {})).get("workers", 8)  # concurrent searches per process
+
+# Topic searches check out their own PRAW instance; PRAW isn't thread-safe
+reddit_pool = get_reddit_pool(st.secrets["reddit"], lambda: reddit_kwargs(cassette, timeout=SEARCH_TIMEOUT), max_size=SEARCH_WORKERS)
+
 curated_subreddits = ["news", "worldnews", "politics", "uspolitics", "technology", "science", "geopolitics"]
 
 # --- Welcome Screen Logic ---
@@ -420,14 +434,12 @@ else:
     post_dict = {}
 
     if topic:
-        for sub in curated_subreddits:
-            try:
-                for post in reddit.subreddit(sub).search(topic, sort="relevance", time_filter="week", limit=2):
-                    if not post.stickied:
-                        headline_options.append(post.title)
-                        post_dict[post.title] = post
-            except:
-                continue
+        search_posts, search_failures = search_subreddits(reddit_pool, curated_subreddits, topic, limit=2, timeout=SEARCH_TIMEOUT, max_workers=SEARCH_WORKERS)
+        for post in search_posts:
+            headline_options.append(post.title)
+            post_dict[post.title] = post
+        if search_failures:
+            st.caption("Couldn't reach: " + ", ".join(f"r/{sub}" for sub in search_failures))
 
 
     
@@ -509,13 +521,12 @@ else:
                 ["", "Hope", "Anger", "Confusion", "Inspiration", "Sadness", "Skepticism", "Indifference"]
             )
 
-                for comment in comments:
-                    comment_text = comment.body.strip() 
-                    text = comment.body.strip()
+                texts = [comment.body.strip() for comment in comments]
+                polarities, labels = get_backend(st.secrets.get("sentiment", {})).score(texts)
+                for comment, text, polarity, label in zip(comments, texts, polarities.tolist(), labels):
+                    comment_text = text
                     if len(text) < 10:
                         continue
-                    polarity = TextBlob(text).sentiment.polarity
-                    label = "Positive" if polarity > 0.1 else "Negative" if polarity < -0.1 else "Neutral"
                     emotion_counts[label] += 1
                     emotion_groups[label].append({
                         "text": text,
@@ -544,7 +555,7 @@ else:
                 else:
                     # Full Agora Mode
                     with st.spinner("Gathering the emotional field..."):
-                        summary = generate_ai_summary(selected_headline, emotion_groups)
+                        summary = generate_ai_summary(selected_headline, emotion_groups, subject=post.id)
                         st.success(summary)
 
                     for label in ["Positive", "Neutral", "Negative"]:
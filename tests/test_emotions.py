@@ -0,0 +1,47 @@
+import numpy as np
+
+from agora_emotions import EMOTIONS, EmotionLexicon, dominant_emotions, score_emotions
+
+
+def test_dont_care_is_indifferent():
+    texts = ["I don't care about this at all", "dont care", "Who cares, honestly"]
+    assert list(dominant_emotions(score_emotions(texts))) == ["Indifferent"] * 3
+
+
+def test_plain_questions_stay_neutral():
+    texts = ["How does this work?", "What did the source say? Really, are you sure?"]
+    assert list(dominant_emotions(score_emotions(texts))) == ["Neutral", "Neutral"]
+
+
+def test_negated_word_is_ignored():
+    scores = score_emotions(["I am not hopeful", "I am hopeful"])
+    hopeful = EMOTIONS.index("Hopeful")
+    assert scores[0, hopeful] == 0.0
+    assert scores[1, hopeful] == 1.0
+
+
+def test_phrases_do_not_cross_comments():
+    # "who" ends one comment and "cares" starts the next
+    scores = score_emotions(["I wonder who", "cares deeply"])
+    assert list(dominant_emotions(scores)) == ["Neutral", "Neutral"]
+
+
+def test_rows_sum_to_one():
+    scores = score_emotions(["Furious and heartbroken", "", "inspiring and brave, so proud"])
+    assert np.allclose(scores.sum(axis=1), 1.0)
+
+
+def test_stems_do_not_match_unrelated_words():
+    texts = ["Health care costs keep rising", "The heroin epidemic is spreading", "The admiral gave a statement"]
+    assert list(dominant_emotions(score_emotions(texts))) == ["Neutral"] * 3
+
+
+def test_explicit_word_forms_still_match():
+    texts = ["The town is healing", "Those nurses are heroes", "I admire her"]
+    assert list(dominant_emotions(score_emotions(texts))) == ["Hopeful", "Inspired", "Inspired"]
+
+
+def test_resolved_tokens_are_bounded():
+    lex = EmotionLexicon(max_resolved=3)
+    score_emotions(["alpha beta gamma delta epsilon hopeful"], lexicon=lex)
+    assert len(lex.resolved) == 3
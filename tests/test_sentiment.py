@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("textblob")
+
+from agora_sentiment import score_texts
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("not good", -0.35),
+    ("Not a very good idea", -0.269),
+    ("Not exactly a great plan", -0.4),
+    ("not very good", -0.269),
+    ("really not good", -0.35),
+    ("I don't think this is bad", -0.7),
+    ("This is not a good idea at all!", -0.438),
+])
+def test_negation_reaches_next_polar_word(text, expected):
+    # Same polarities as TextBlob
+    assert score_texts([text])[0][0] == pytest.approx(expected, abs=1e-3)
+
+
+def test_negation_stops_at_longer_words():
+    # "the" breaks the negation, as in TextBlob
+    assert score_texts(["not the best"])[0][0] == pytest.approx(1.0)
+
+
+def test_negation_does_not_cross_comments():
+    polarities, labels = score_texts(["I will not", "a very good idea"])
+    assert polarities[1] == pytest.approx(0.91)
+    assert list(labels) == ["Neutral", "Positive"]